@@ -1,7 +1,8 @@
 import os
 import json
-from openai import OpenAI
-import httpx
+from data_filling.utils.llm_client import get_openai_client
+from data_filling.utils.rate_limiter import get_rate_limiter
+from data_filling.model.tools.prompt_builder import estimate_tokens_from_messages
 
 
 class BrandKnowledgeAgent:
@@ -11,20 +12,10 @@ class BrandKnowledgeAgent:
 
         self.model = config.get("openai_model_knowledge", "gpt-4o-search-preview-2025-03-11")
         self.client = self._build_client(config)
+        self.limiter = get_rate_limiter(config, self.model)
 
     def _build_client(self, config: dict):
-        api_key = config.get("openai_api_key")
-        verify_ssl = config.get("verify_ssl", True)
-
-        if not api_key:
-            raise ValueError("Missing OpenAI API key in config.")
-
-        if not verify_ssl:
-            print("⚠️ SSL verification disabled (dev mode).")
-            http_client = httpx.Client(verify=False)
-            return OpenAI(api_key=api_key, http_client=http_client)
-
-        return OpenAI(api_key=api_key)
+        return get_openai_client(config)
 
     def generate_knowledge(self, brand_name: str) -> dict:
         prompt = (
@@ -36,14 +27,19 @@ class BrandKnowledgeAgent:
             "Only return the JSON with those 3 keys. Do not add explanations or any other text."
         )
 
+        messages = [
+            {"role": "system", "content": "You are a brand analysis expert."},
+            {"role": "user", "content": prompt}
+        ]
+
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a brand analysis expert."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=1000
+            response = self.limiter.call(
+                lambda: self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    max_tokens=1000
+                ),
+                tokens=estimate_tokens_from_messages(messages, self.model) + 1000
             )
         except Exception as e:
             print(f"❌ OpenAI API error during brand knowledge generation: {e}")
@@ -1,10 +1,13 @@
+import asyncio
 import base64
-import cv2
+import hashlib
 import json
-import httpx
-from openai import OpenAI
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from data_filling.model.tools.prompt_builder import (
+    estimate_tokens_from_messages,
+    estimate_chunks_tokens,
     smart_split_prompt,
     merge_responses,
     build_prompt_messages,
@@ -17,6 +20,11 @@ from data_filling.model.tools.result_parser import parse_gpt_output
 from data_filling.model.tools.compute_ratios import compute_frame_ratios
 from data_filling.model.tools.audio_selector import select_audio
 from data_filling.model.tools.mapper import remap_keys_to_labels
+from data_filling.model.tools.media_encoder import MediaEncoder, media_settings
+from data_filling.utils.image_utils import parse_grid_packing
+from data_filling.utils.llm_client import get_openai_client, get_async_openai_client
+from data_filling.utils.rate_limiter import get_rate_limiter
+from data_filling.utils.sqlite_cache import SQLiteCache
 
 class GPTMultiColumnModel:
     """
@@ -30,17 +38,49 @@ class GPTMultiColumnModel:
         self._model_name = config.get("openai_model", "gpt-4o")
         self._model_transcript_name = config.get("openai_model_transcript", "gpt-4o-transcribe")
         self._template_path = config.get("template_path")
+        # Max number of API calls in flight for one model (1 = sequential chunks and batches)
+        self._llm_concurrency = max(1, int(config.get("llm_concurrency", 1)))
+        self._request_slots = threading.BoundedSemaphore(self._llm_concurrency)
+        # Shared RPM/TPM budgets and retries (see openai_rpm / openai_tpm in the config)
+        self._limiter = get_rate_limiter(config, self._model_name)
+        self._transcript_limiter = get_rate_limiter(config, self._model_transcript_name)
+        self._image_token_cost = int(config.get("image_token_cost", 100))
+        # "binpack": merge batches differing only by split_possible and bin-pack their fields
+        self._bin_packing = config.get("chunk_planner", "greedy") == "binpack"
+        # Tiles of `packing: grid_RxC` tags
+        self._grid_tile_width = int(config.get("grid_tile_width", 512))
+        self._grid_labels = config.get("grid_labels", True)
+        # Persistent cache of chunk answers, keyed by the exact request content (disabled without a path)
+        cache_path = config.get("response_cache_path")
+        self._response_cache = SQLiteCache(
+            cache_path,
+            table="llm_responses",
+            max_mb=config.get("response_cache_max_mb", 512),
+            max_age_days=config.get("response_cache_max_age_days", 30)
+        ) if cache_path else None
+        # Transcriptions keyed by audio content + model, persisted in the same store by default
+        transcript_cache_path = config.get("transcription_cache_path", cache_path)
+        self._transcript_cache = SQLiteCache(
+            transcript_cache_path,
+            table="transcriptions",
+            max_mb=config.get("response_cache_max_mb", 512),
+            max_age_days=config.get("response_cache_max_age_days", 30)
+        ) if transcript_cache_path else None
+        self._transcripts_lock = threading.Lock()
+
+    def _map_concurrent(self, fn, items) -> list:
+        """
+        Apply `fn` to every item, up to `llm_concurrency` at a time.
+        Results are returned in the order of `items`.
+        """
+        items = list(items)
+        if self._llm_concurrency <= 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(self._llm_concurrency, len(items))) as pool:
+            return list(pool.map(fn, items))
 
     def _build_client(self):
-        api_key = self._config.get("openai_api_key")
-        verify_ssl = self._config.get("verify_ssl", True)
-        if not api_key:
-            raise ValueError("Missing 'openai_api_key' in config.")
-        if not verify_ssl:
-            print("⚠️ SSL verification disabled (dev mode).")
-            http_client = httpx.Client(verify=False)
-            return OpenAI(api_key=api_key, http_client=http_client)
-        return OpenAI(api_key=api_key)
+        return get_openai_client(self._config)
 
     def _load_template(self, brand_knowledge_path: str = None):
         with open(self._template_path, "r", encoding="utf-8") as f:
@@ -65,13 +105,6 @@ class GPTMultiColumnModel:
 
         return template
 
-    def _encode_image(self, img_path: str) -> str:
-        image = cv2.imread(img_path)
-        success, buffer = cv2.imencode(".jpg", image)
-        if not success:
-            raise ValueError(f"Failed to encode image: {img_path}")
-        return base64.b64encode(buffer).decode("utf-8")
-
     def _encode_audio(self, audio_path: str) -> str:
         """
         Encode an audio file to base64.
@@ -80,25 +113,172 @@ class GPTMultiColumnModel:
             audio_data = f.read()
         return base64.b64encode(audio_data).decode("utf-8")
 
-    def _send_request(self, base64_images: List[str], transcriptions: List[str], prompt_data: Dict) -> dict:
-        messages = build_prompt_messages(prompt_data, base64_images, transcriptions)
-        response = self._client.chat.completions.create(
-            model=self._model_name,
-            messages=messages,
-            max_tokens=8000,
-            temperature=0
+    def _estimate_request_tokens(self, messages: List[Dict], max_tokens: int) -> int:
+        # OpenAI counts the requested completion budget against the TPM limit too
+        return estimate_tokens_from_messages(messages, self._model_name, self._image_token_cost) + max_tokens
+
+    def _response_cache_key(self, messages: List[Dict], base64_images: List[str], transcriptions: List[str],
+                            prompt_data: Dict, image_detail: str = None) -> str:
+        payload = {
+            "model": self._model_name,
+            "system_prompt": messages[0]["content"],
+            "fields": sorted(prompt_data),
+            "images": [hashlib.sha256(b64.encode("utf-8")).hexdigest() for b64 in base64_images or []],
+            "transcription": hashlib.sha256("\n".join(transcriptions or []).encode("utf-8")).hexdigest(),
+            "detail": image_detail,
+            "temperature": 0,
+            "max_tokens": 8000,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _cached_response(self, messages, base64_images, transcriptions, prompt_data, image_detail=None):
+        """Return (cache key, cached answer or None)."""
+        if self._response_cache is None:
+            return None, None
+        key = self._response_cache_key(messages, base64_images, transcriptions, prompt_data, image_detail)
+        return key, self._response_cache.get(key)
+
+    def _store_response(self, key: str, parsed: dict, prompt_data: Dict):
+        # Only complete answers that pass validation are cached: anything else is asked again
+        if key and parsed and set(parsed) == set(prompt_data) and not self._validate_chunk(parsed, prompt_data)[1]:
+            self._response_cache.put(key, parsed)
+
+    def report_cache_stats(self):
+        if self._response_cache is not None:
+            print(f"📦 LLM response cache: {self._response_cache.stats()}")
+        if self._transcript_cache is not None:
+            print(f"📦 Transcription cache: {self._transcript_cache.stats()}")
+
+    def _send_request(self, base64_images: List[str], transcriptions: List[str], prompt_data: Dict,
+                      image_detail: str = None, use_cache: bool = True) -> dict:
+        """:param use_cache: False for retries, which must not get the cached answer of the first round"""
+        messages = build_prompt_messages(prompt_data, base64_images, transcriptions, image_detail)
+        cache_key, cached = None, None
+        if use_cache:
+            cache_key, cached = self._cached_response(messages, base64_images, transcriptions, prompt_data, image_detail)
+        if cached is not None:
+            return cached
+        # The slot is only held during the call itself, not while waiting for the rate limit or a retry
+        response = self._limiter.call(
+            lambda: self._client.chat.completions.create(
+                model=self._model_name,
+                messages=messages,
+                max_tokens=8000,
+                temperature=0
+            ),
+            tokens=self._estimate_request_tokens(messages, 8000),
+            slot=self._request_slots
         )
-        return self._parse_response(response.choices[0].message.content.strip())
+        parsed = self._parse_response(response.choices[0].message.content.strip())
+        self._store_response(cache_key, parsed, prompt_data)
+        return parsed
+
+    async def _send_request_async(self, base64_images: List[str], transcriptions: List[str], prompt_data: Dict,
+                                  slots: asyncio.Semaphore, image_detail: str = None, use_cache: bool = True) -> dict:
+        messages = build_prompt_messages(prompt_data, base64_images, transcriptions, image_detail)
+        cache_key, cached = None, None
+        if use_cache:
+            # Hashing and SQLite lookups block: they run in a thread, off the event loop
+            cache_key, cached = await asyncio.to_thread(
+                self._cached_response, messages, base64_images, transcriptions, prompt_data, image_detail
+            )
+        if cached is not None:
+            return cached
+        client = get_async_openai_client(self._config)
+        tokens = await asyncio.to_thread(self._estimate_request_tokens, messages, 8000)
+        response = await self._limiter.call_async(
+            lambda: client.chat.completions.create(
+                model=self._model_name,
+                messages=messages,
+                max_tokens=8000,
+                temperature=0
+            ),
+            tokens=tokens,
+            slot=slots
+        )
+        parsed = self._parse_response(response.choices[0].message.content.strip())
+        await asyncio.to_thread(self._store_response, cache_key, parsed, prompt_data)
+        return parsed
 
     def _send_request_transcript(self, audio_path: str) -> str:
         with open(audio_path, "rb") as audio_file:
-                transcription = self._client.audio.transcriptions.create(
+            def transcribe():
+                audio_file.seek(0)  # the file is sent again on retries
+                return self._client.audio.transcriptions.create(
                     model=self._model_transcript_name,  # exemple : "gpt-4o-transcribe"
                     file=audio_file,
                     response_format="text"
                 )
+
+            # Audio is not token-estimated: only the request budget applies
+            transcription = self._transcript_limiter.call(transcribe, slot=self._request_slots)
         return transcription.strip() if isinstance(transcription, str) else ""
 
+    async def _send_request_transcript_async(self, audio_path: str, slots: asyncio.Semaphore) -> str:
+        client = get_async_openai_client(self._config)
+        with open(audio_path, "rb") as audio_file:
+            def transcribe():
+                audio_file.seek(0)
+                return client.audio.transcriptions.create(
+                    model=self._model_transcript_name,
+                    file=audio_file,
+                    response_format="text"
+                )
+
+            transcription = await self._transcript_limiter.call_async(transcribe, slot=slots)
+        return transcription.strip() if isinstance(transcription, str) else ""
+
+
+    def _transcription_key(self, audio_path: str) -> str:
+        digest = hashlib.sha256()
+        with open(audio_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return f"{self._model_transcript_name}:{digest.hexdigest()}"
+
+    def _cached_transcription(self, key: str):
+        return self._transcript_cache.get(key) if self._transcript_cache is not None else None
+
+    def _store_transcription(self, key: str, transcription: str):
+        if self._transcript_cache is not None and transcription:
+            self._transcript_cache.put(key, transcription)
+
+    def _transcribe(self, audio_path: str, transcripts: dict) -> str:
+        """
+        Transcribe an audio file at most once per video (`transcripts` is shared by the batches of
+        one predict call, even when they run concurrently) and at most once across runs.
+        """
+        key = self._transcription_key(audio_path)
+        with self._transcripts_lock:
+            future = transcripts.get(key)
+            owner = future is None
+            if owner:
+                future = transcripts[key] = Future()
+
+        if owner:
+            try:
+                transcription = self._cached_transcription(key)
+                if transcription is None:
+                    transcription = self._send_request_transcript(audio_path)
+                    self._store_transcription(key, transcription)
+                future.set_result(transcription)
+            except Exception as e:
+                future.set_exception(e)
+        return future.result()
+
+    async def _transcribe_async_uncached(self, audio_path: str, key: str, slots: asyncio.Semaphore) -> str:
+        transcription = await asyncio.to_thread(self._cached_transcription, key)
+        if transcription is None:
+            transcription = await self._send_request_transcript_async(audio_path, slots)
+            await asyncio.to_thread(self._store_transcription, key, transcription)
+        return transcription
+
+    async def _transcribe_async(self, audio_path: str, transcripts: dict, slots: asyncio.Semaphore) -> str:
+        key = await asyncio.to_thread(self._transcription_key, audio_path)
+        task = transcripts.get(key)
+        if task is None:
+            task = transcripts[key] = asyncio.ensure_future(self._transcribe_async_uncached(audio_path, key, slots))
+        return await task
 
     def _parse_response(self, raw: str) -> dict:
         if raw.startswith("```json"):
@@ -163,11 +343,23 @@ class GPTMultiColumnModel:
 
         return validated, invalid
 
-    def _multi_prompt_process(self, prompt_data, base64_images=None, transcriptions=None, ratios=None,
-                              current_frame_method=None):
+    def _multi_prompt_rounds(self, prompt_data, base64_images=None, transcriptions=None, ratios=None,
+                             current_frame_method=None, frames_per_image=None, image_detail=None):
+        """
+        Split, validate, retry and merge the answers for one batch of tags.
+        This generator yields each round of chunks to send and receives their raw responses
+        (in the same order), so sync and async callers share the same logic. Returns the merged results.
+        The first round is taken when the calls of the video are planned (see `_plan_batches`); it is
+        empty when the prompt is too heavy to split.
+        Chunk answers are weighted by their number of frames (`frames_per_image` for grid images).
+        """
         all_responses = []
         invalid_fields = []
         frames_per_chunk = []
+        frame_counts = dict(zip(base64_images or [], frames_per_image or []))
+
+        def chunk_frames(image_chunk):
+            return sum(frame_counts.get(b64, 1) for b64 in image_chunk)
 
         if not base64_images and not transcriptions:
             raise ValueError("❌ No images or transcription provided for processing. At least one must be non-empty.")
@@ -180,25 +372,29 @@ class GPTMultiColumnModel:
             model=self._model_name,
             max_images_per_chunk=10,
             max_chunks=15,
-            split_image=True
+            split_image=True,
+            bin_packing=self._bin_packing,
+            image_detail=image_detail,
+            image_tokens=self._image_token_cost
         )
 
+        # All chunks are sent concurrently, then handled in their original order
+        raws = yield chunks
+
         if not chunks:
             print("❌ Aborted: prompt too heavy to split reasonably.")
             return {k: "N/A" for k in prompt_data}
-
         print(f"🔄 Processing {len(chunks)} initial chunk(s)...")
 
-        for i, (prompt_chunk, image_chunk, transcription_chunk) in enumerate(chunks):
+        for i, ((prompt_chunk, image_chunk, transcription_chunk), raw) in enumerate(zip(chunks, raws)):
             print(
                 f"🧩 Chunk {i + 1}/{len(chunks)} — {len(prompt_chunk)} fields, {len(image_chunk)} image(s), {len(transcription_chunk)} transcription(s)")
-            raw = self._send_request(image_chunk, transcription_chunk, prompt_chunk)
             print(raw)
 
             validated, invalid = self._validate_chunk(raw, prompt_chunk)
             all_responses.append(validated)
 
-            frames_per_chunk.append(len(image_chunk) if image_chunk else 1)  # texte = 1 ratio = 1
+            frames_per_chunk.append(chunk_frames(image_chunk) if image_chunk else 1)  # texte = 1 ratio = 1
 
             for k in invalid:
                 if k not in [key for d in all_responses for key in d]:
@@ -216,19 +412,24 @@ class GPTMultiColumnModel:
                 model=self._model_name,
                 max_images_per_chunk=10,
                 max_chunks=10,
-                split_image=True
+                split_image=True,
+                bin_packing=self._bin_packing,
+                image_detail=image_detail,
+                image_tokens=self._image_token_cost
             )
 
             if not retry_chunks:
                 print("⚠️ Retry prompt too heavy, skipping retry.")
             else:
-                for i, (prompt_chunk, image_chunk, transcription_chunk) in enumerate(retry_chunks):
+                retry_raws = yield retry_chunks
+                for i, ((prompt_chunk, image_chunk, transcription_chunk), raw) in enumerate(
+                    zip(retry_chunks, retry_raws)
+                ):
                     print(f"🔁 Retry Chunk {i + 1}/{len(retry_chunks)} — {len(prompt_chunk)} fields")
-                    raw = self._send_request(image_chunk, transcription_chunk, prompt_chunk)
                     validated, _ = self._validate_chunk(raw, prompt_chunk)
                     all_responses.append(validated)
 
-                    frames_per_chunk.append(len(image_chunk) if image_chunk else 1)
+                    frames_per_chunk.append(chunk_frames(image_chunk) if image_chunk else 1)
 
         # Final merge
         merged = merge_responses(
@@ -247,6 +448,167 @@ class GPTMultiColumnModel:
 
         return merged
 
+    def _plan_batches(self, prepared: list, ratios: dict) -> list:
+        """
+        Split every prepared batch (see `_prepare_batch`) into its initial chunks before any request
+        is sent, and print the planned calls and prompt tokens of the whole video.
+        Return one (rounds, initial chunks, image detail) plan per batch.
+        """
+        plans = []
+        fields = calls = tokens = 0
+        for batch_key, batch_config, base64_images, transcriptions, image_detail, frames_per_image in prepared:
+            rounds = self._multi_prompt_rounds(
+                batch_config, base64_images, transcriptions, ratios, batch_key[0], frames_per_image, image_detail
+            )
+            chunks = next(rounds)
+            plans.append((rounds, chunks, image_detail))
+            fields += len(batch_config)
+            calls += len(chunks)
+            tokens += estimate_chunks_tokens(chunks, self._model_name, image_detail, self._image_token_cost)
+
+        print(f"🧮 Planned {calls} call(s), ~{tokens} prompt tokens for {fields} field(s) in {len(plans)} batch(es)")
+        return plans
+
+    def _multi_prompt_process(self, rounds, chunks, image_detail=None):
+        """Send the rounds of a planned batch (see `_plan_batches`) and return its merged results."""
+        try:
+            use_cache = True
+            while True:
+                raws = self._map_concurrent(
+                    lambda chunk: self._send_request(chunk[1], chunk[2], chunk[0], image_detail, use_cache), chunks
+                )
+                chunks = rounds.send(raws)
+                use_cache = False  # later rounds are retries
+        except StopIteration as done:
+            return done.value
+
+    async def _multi_prompt_process_async(self, rounds, chunks, image_detail=None, slots: asyncio.Semaphore = None):
+        try:
+            use_cache = True
+            while True:
+                raws = await asyncio.gather(*(
+                    self._send_request_async(
+                        image_chunk, transcription_chunk, prompt_chunk, slots, image_detail, use_cache
+                    )
+                    for prompt_chunk, image_chunk, transcription_chunk in chunks
+                ))
+                chunks = rounds.send(list(raws))
+                use_cache = False  # later rounds are retries
+        except StopIteration as done:
+            return done.value
+
+    def _select_batch_media(self, batch_key: tuple, video_frames_dict: dict):
+        """
+        Return the frames and audio files used by one batch of tags.
+        """
+        frame_method, frames_used, split_possible, audio_key, packing = batch_key
+        selected_frames = []
+        selected_audio_paths = []
+
+        # Try to get frames
+        if frame_method and frame_method in video_frames_dict:
+            full_frames = video_frames_dict[frame_method]
+            selected_frames = select_frames(full_frames, frames_used)
+            print(f"📸 Selected {len(selected_frames)} frame(s) for {frame_method}")
+        else:
+            print(f"⚠️ Missing frames for method: {frame_method}")
+
+        # Try to get audio
+        if audio_key and audio_key in video_frames_dict:
+            selected_audio_paths = video_frames_dict[audio_key]
+            print(f"🎵 Selected {len(selected_audio_paths)} audio file(s) for {audio_key}")
+        else:
+            print(f"⚠️ Missing audio for key: {audio_key}")
+
+        return selected_frames, selected_audio_paths
+
+    def _encode_batch_images(self, batch_key: tuple, selected_frames: list, transcriptions: list,
+                             media: MediaEncoder, max_edge: int, jpeg_quality: int):
+        """
+        Encode the frames of a batch, tiled into grids if the batch asks for `packing: grid_RxC`.
+        Return (base64 images, number of frames in each image), or None if the batch has neither
+        frames nor transcription.
+        """
+        frame_method, _, _, audio_key, packing = batch_key
+        grid = parse_grid_packing(packing)
+
+        # Encode media (each frame or grid once per video and encoding settings)
+        if grid:
+            rows, cols = grid
+            groups = [selected_frames[i:i + rows * cols] for i in range(0, len(selected_frames), rows * cols)]
+            base64_images = [
+                media.encode_grid(group, rows, cols, self._grid_tile_width, self._grid_labels, max_edge, jpeg_quality)
+                for group in groups
+            ]
+            frames_per_image = [len(group) for group in groups]
+            print(f"🧩 Packed {len(selected_frames)} frame(s) into {len(groups)} {packing} image(s)")
+        else:
+            base64_images = [media.encode_image(p, max_edge, jpeg_quality) for p in selected_frames]
+            frames_per_image = [1] * len(base64_images)
+
+        # Validation
+        if not base64_images and not transcriptions:
+            print(
+                f"⚠️ Skipping batch: no frames nor audio available for frame_method={frame_method} audio={audio_key}"
+            )
+            return None
+        return base64_images, frames_per_image
+
+    def _prepare_batch(self, batch_key: tuple, batch_config: dict, video_frames_dict: dict, transcripts: dict,
+                       media: MediaEncoder):
+        """
+        Select, transcribe and encode the media of one batch of tags.
+        Return (batch key, batch config, base64 images, transcriptions, image detail, frames per image),
+        or None if the batch is skipped.
+        """
+        selected_frames, selected_audio_paths = self._select_batch_media(batch_key, video_frames_dict)
+
+        # Transcribe each audio file
+        transcriptions = []
+        for audio_path in selected_audio_paths:
+            try:
+                transcription_text = self._transcribe(audio_path, transcripts)
+                transcriptions.append(transcription_text)
+            except Exception as e:
+                print(f"⚠️ Transcription failed for {audio_path}: {e}")
+
+        max_edge, jpeg_quality, image_detail = media_settings(batch_config, self._config)
+        encoded = self._encode_batch_images(
+            batch_key, selected_frames, transcriptions, media, max_edge, jpeg_quality
+        )
+        if encoded is None:
+            return None
+        base64_images, frames_per_image = encoded
+        return batch_key, batch_config, base64_images, transcriptions, image_detail, frames_per_image
+
+    async def _prepare_batch_async(self, batch_key: tuple, batch_config: dict, video_frames_dict: dict,
+                                   transcripts: dict, media: MediaEncoder, slots: asyncio.Semaphore):
+        # Reading lazy framings extracts them: done in a thread like the other blocking steps
+        selected_frames, selected_audio_paths = await asyncio.to_thread(
+            self._select_batch_media, batch_key, video_frames_dict
+        )
+
+        # Transcribe each audio file
+        transcriptions = []
+        results = await asyncio.gather(
+            *(self._transcribe_async(audio_path, transcripts, slots) for audio_path in selected_audio_paths),
+            return_exceptions=True
+        )
+        for audio_path, transcription_text in zip(selected_audio_paths, results):
+            if isinstance(transcription_text, Exception):
+                print(f"⚠️ Transcription failed for {audio_path}: {transcription_text}")
+            else:
+                transcriptions.append(transcription_text)
+
+        max_edge, jpeg_quality, image_detail = media_settings(batch_config, self._config)
+        encoded = await asyncio.to_thread(
+            self._encode_batch_images, batch_key, selected_frames, transcriptions, media, max_edge, jpeg_quality
+        )
+        if encoded is None:
+            return None
+        base64_images, frames_per_image = encoded
+        return batch_key, batch_config, base64_images, transcriptions, image_detail, frames_per_image
+
     def predict(self, video_frames_dict: dict, brand_knowledge_path: str = None) -> dict:
 
         print(brand_knowledge_path)
@@ -254,62 +616,54 @@ class GPTMultiColumnModel:
         Main prediction routine, supports brand-specific prompt enrichment.
         """
         template = self._load_template(brand_knowledge_path)
-        batches = group_tags_by_batch(template)
+        batches = group_tags_by_batch(template, merge_split_possible=self._bin_packing)
         ratios = compute_frame_ratios(video_frames_dict)
         print("template", template)
         final_results = {}
+        transcripts = {}
+        media = MediaEncoder()
 
-        for (frame_method, frames_used, split_possible, audio_key), batch_config in batches:
-            selected_frames = []
-            selected_audio_paths = []
-            transcriptions = []
-
-            # Try to get frames
-            if frame_method and frame_method in video_frames_dict:
-                full_frames = video_frames_dict[frame_method]
-                selected_frames = select_frames(full_frames, frames_used)
-                print(f"📸 Selected {len(selected_frames)} frame(s) for {frame_method}")
-            else:
-                print(f"⚠️ Missing frames for method: {frame_method}")
-
-            # Try to get audio
-            if audio_key and audio_key in video_frames_dict:
-                selected_audio_paths = video_frames_dict[audio_key]
-                print(f"🎵 Selected {len(selected_audio_paths)} audio file(s) for {audio_key}")
-                # Transcribe each audio file
-                for audio_path in selected_audio_paths:
-                    try:
-                        transcription_text = self._send_request_transcript(audio_path)
-                        transcriptions.append(transcription_text)
-                    except Exception as e:
-                        print(f"⚠️ Transcription failed for {audio_path}: {e}")
-            else:
-                print(f"⚠️ Missing audio for key: {audio_key}")
-
-            # Encode media
-            base64_images = [self._encode_image(p) for p in selected_frames] if selected_frames else []
-
-            # Validation
-            if not base64_images and not transcriptions:
-                print(
-                    f"⚠️ Skipping batch: no frames nor audio available for frame_method={frame_method} audio={audio_key}"
-                )
-                continue
-
-            # Process
-            result = self._multi_prompt_process(
-                batch_config,
-                base64_images=base64_images,
-                transcriptions=transcriptions,
-                ratios=ratios,
-                current_frame_method=frame_method
-            )
-            print(result)
-            final_results.update(result)
+        # Batches are independent: they are prepared concurrently, all planned, then sent
+        # concurrently and merged in template order
+        prepared = self._map_concurrent(
+            lambda batch: self._prepare_batch(batch[0], batch[1], video_frames_dict, transcripts, media), batches
+        )
+        plans = self._plan_batches([batch for batch in prepared if batch], ratios)
+        results = self._map_concurrent(lambda plan: self._multi_prompt_process(*plan), plans)
+        for result in results:
+            if result:
+                final_results.update(result)
 
         readable = remap_keys_to_labels(final_results, template)
         return readable
 
+    async def predict_async(self, video_frames_dict: dict, brand_knowledge_path: str = None) -> dict:
+        """
+        Async version of `predict`: all batches, chunks and transcriptions of the video are sent
+        concurrently through the AsyncOpenAI client of the running event loop, at most `llm_concurrency`
+        at a time. File reads, extraction, encoding and cache lookups run in threads.
+        Await `close_async_openai_clients()` before the event loop ends.
+        """
+        template = await asyncio.to_thread(self._load_template, brand_knowledge_path)
+        batches = group_tags_by_batch(template, merge_split_possible=self._bin_packing)
+        ratios = await asyncio.to_thread(compute_frame_ratios, video_frames_dict)
+        slots = asyncio.Semaphore(self._llm_concurrency)
+        final_results = {}
+        transcripts = {}
+        media = MediaEncoder()
+
+        prepared = await asyncio.gather(*(
+            self._prepare_batch_async(batch_key, batch_config, video_frames_dict, transcripts, media, slots)
+            for batch_key, batch_config in batches
+        ))
+        plans = await asyncio.to_thread(self._plan_batches, [batch for batch in prepared if batch], ratios)
+        results = await asyncio.gather(*(
+            self._multi_prompt_process_async(rounds, chunks, image_detail, slots)
+            for rounds, chunks, image_detail in plans
+        ))
+        for result in results:
+            if result:
+                final_results.update(result)
 
-
-
+        readable = remap_keys_to_labels(final_results, template)
+        return readable
@@ -2,9 +2,11 @@ from collections import defaultdict
 
 from collections import defaultdict
 
-def group_tags_by_batch(tag_config: dict):
+def group_tags_by_batch(tag_config: dict, merge_split_possible: bool = False):
     """
-    Regroupe les colonnes selon leur frame_method + frames_used + split_possible + audio.
+    Regroupe les colonnes selon leur frame_method + frames_used + split_possible + audio + packing.
+    With `merge_split_possible`, columns that share the same frames and audio are grouped
+    whatever their split_possible (the batch key then has split_possible=None).
     Retourne : list of (batch_key, batch_config)
     """
     batches = defaultdict(dict)
@@ -12,8 +14,9 @@ def group_tags_by_batch(tag_config: dict):
         batch_key = (
             conf.get("frame_method"),
             conf.get("frames_used"),
-            conf.get("split_possible"),
-            conf.get("audio", None)  # on ajoute l'audio même si None
+            None if merge_split_possible else conf.get("split_possible"),
+            conf.get("audio", None),  # on ajoute l'audio même si None
+            conf.get("packing") or None  # e.g. "grid_3x3": several frames tiled per image
         )
         batches[batch_key][conf["key"]] = conf
     return list(batches.items())
@@ -0,0 +1,109 @@
+"""
+Micro-benchmark of smart_split_prompt against the previous quadratic splitter.
+
+    python -m data_filling.model.tools.benchmark_split_prompt [template.json] [--fields 80] [--repeat 5]
+
+Without a template, a synthetic template of `--fields` tags is used. Chunk boundaries of both
+splitters are compared for several token budgets before timing them.
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+from typing import Dict, List
+from data_filling.model.tools import prompt_builder
+from data_filling.model.tools.prompt_builder import build_prompt_messages, smart_split_prompt
+
+
+def legacy_split_prompt(prompt_data: Dict, images_b64: List[str], transcriptions: List[str] = None,
+                        max_tokens: int = 8000, model: str = "gpt-4", max_images_per_chunk: int = 6,
+                        max_chunks: int = 10) -> list:
+    """Previous splitter (image split case): rebuilds and re-tokenizes the whole prompt for every field."""
+    all_chunks = []
+    transcript = transcriptions if transcriptions else []
+    for i in range(0, len(images_b64), max_images_per_chunk):
+        image_chunk = images_b64[i:i + max_images_per_chunk]
+        current_fields = {}
+        for key, val in prompt_data.items():
+            test_fields = {**current_fields, key: val}
+            enc = prompt_builder.tiktoken.encoding_for_model(model)
+            messages = build_prompt_messages(test_fields, image_chunk, transcript)
+            token_estimate = len(enc.encode(messages[0]["content"])) + len(enc.encode(messages[1]["content"][0]["text"]))
+            token_estimate += 100 * len(image_chunk)
+            if token_estimate > max_tokens:
+                if not current_fields:
+                    all_chunks.append(({key: val}, image_chunk, transcript))
+                else:
+                    all_chunks.append((current_fields.copy(), image_chunk, transcript))
+                    current_fields = {key: val}
+            else:
+                current_fields[key] = val
+        if current_fields:
+            all_chunks.append((current_fields.copy(), image_chunk, transcript))
+    if len(all_chunks) > max_chunks:
+        return []
+    return all_chunks
+
+
+def synthetic_template(n_fields: int) -> Dict:
+    return {
+        f"tag_{i:03d}": {
+            "prompt_ai": f"Does the advertisement show element number {i} (logo, product, people, text)? "
+                         "Answer 1 if it is clearly visible in at least one frame, otherwise 0." * (1 + i % 3),
+            "accepted_values": ["0", "1"] if i % 4 else [str(v) for v in range(0, 101, 10)],
+        }
+        for i in range(n_fields)
+    }
+
+
+def _boundaries(chunks) -> list:
+    return [(list(fields), len(images)) for fields, images, _ in chunks]
+
+
+def _timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def run_benchmark(template: Dict, repeat: int = 5, model: str = "gpt-4o"):
+    images = ["A" * 64] * 10
+    transcriptions = ["A voice says: enjoy responsibly."]
+    with contextlib.redirect_stdout(io.StringIO()):
+        messages = build_prompt_messages(template, images[:6], transcriptions)
+    full_cost = prompt_builder.estimate_tokens_from_messages(messages, model)
+    print(f"{len(template)} fields, {full_cost} tokens for the full prompt")
+
+    for max_tokens in (full_cost // 7, full_cost // 3, full_cost + 1):
+        args = (template, images, transcriptions, max_tokens, model, 6, 100)
+        with contextlib.redirect_stdout(io.StringIO()):
+            same = _boundaries(smart_split_prompt(*args)) == _boundaries(legacy_split_prompt(*args))
+        if not same:
+            print(f"❌ Chunk boundaries differ for max_tokens={max_tokens}")
+            return
+        prompt_builder._count_tokens.cache_clear()
+        legacy = _timed(lambda: legacy_split_prompt(*args), repeat)
+        # Field costs are memoized across calls: the first call is the cold one
+        cold = _timed(lambda: (prompt_builder._count_tokens.cache_clear(), smart_split_prompt(*args)), repeat)
+        warm = _timed(lambda: smart_split_prompt(*args), repeat)
+        print(f"max_tokens={max_tokens}: legacy {legacy * 1000:.1f} ms, linear {cold * 1000:.1f} ms "
+              f"(x{legacy / cold:.0f}), memoized {warm * 1000:.2f} ms (x{legacy / warm:.0f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark smart_split_prompt")
+    parser.add_argument("template", nargs="?", help="Template JSON (default: synthetic template)")
+    parser.add_argument("--fields", type=int, default=80, help="Number of synthetic fields")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--model", default="gpt-4o")
+    args = parser.parse_args()
+
+    if args.template:
+        with open(args.template, "r", encoding="utf-8") as f:
+            tpl = {v["key"]: v for v in json.load(f).values()}
+    else:
+        tpl = synthetic_template(args.fields)
+    run_benchmark(tpl, repeat=args.repeat, model=args.model)
@@ -0,0 +1,148 @@
+import base64
+import json
+import os
+import threading
+from typing import List
+import cv2
+import numpy as np
+from data_filling.utils.image_utils import tile_images
+
+# Vision `detail` levels, from the cheapest to the most detailed
+DETAIL_LEVELS = ("low", "auto", "high")
+
+
+# Start-of-frame markers (baseline, progressive, ...) holding the JPEG dimensions
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def jpeg_size(data: bytes):
+    """Return (width, height) read from a JPEG header, or None if `data` is not a readable JPEG."""
+    if data[:2] != b"\xff\xd8":
+        return None
+    i = 2
+    while i + 4 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:  # fill byte
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # markers without payload
+            i += 2
+            continue
+        if marker in _SOF_MARKERS and i + 9 <= len(data):
+            height = int.from_bytes(data[i + 5:i + 7], "big")
+            width = int.from_bytes(data[i + 7:i + 9], "big")
+            return width, height
+        i += 2 + int.from_bytes(data[i + 2:i + 4], "big")
+    return None
+
+
+def encode_image(img_path: str, max_edge: int = None, jpeg_quality: int = 95) -> str:
+    """
+    Return a frame as base64 JPEG. JPEG files already within `max_edge` (None = no limit) are sent
+    as written by the extractors; other frames are decoded, downscaled so their longest edge is
+    at most `max_edge` and encoded with the given quality.
+    """
+    with open(img_path, "rb") as f:
+        data = f.read()
+
+    size = jpeg_size(data)
+    if size is not None and (not max_edge or max(size) <= max_edge):
+        return base64.b64encode(data).decode("utf-8")
+
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Failed to read image: {img_path}")
+    return encode_array(image, max_edge, jpeg_quality)
+
+
+def encode_array(image: np.ndarray, max_edge: int = None, jpeg_quality: int = 95) -> str:
+    """Downscale a BGR image to `max_edge` (None = no limit) and return it as base64 JPEG."""
+    height, width = image.shape[:2]
+    if max_edge and max(height, width) > max_edge:
+        scale = max_edge / max(height, width)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+    success, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)])
+    if not success:
+        raise ValueError("Failed to encode image.")
+    return base64.b64encode(buffer).decode("utf-8")
+
+
+def media_settings(batch_config: dict, config: dict) -> tuple:
+    """
+    Return (max_edge, jpeg_quality, detail) for a batch of tags.
+    Tags may override the `image_max_edge`, `image_jpeg_quality` and `image_detail` config defaults;
+    when the tags of a batch disagree, the most detailed setting wins.
+    """
+    def values(name):
+        # Tags without their own value use the config default, which takes part in the comparison too
+        return [
+            conf[name] if conf.get(name) not in (None, "") else config.get(name) for conf in batch_config.values()
+        ] or [config.get(name)]
+
+    edges = values("image_max_edge")
+    max_edge = None if None in edges or 0 in edges else max(int(e) for e in edges)
+    qualities = [int(q) for q in values("image_jpeg_quality") if q is not None]
+    jpeg_quality = max(qualities) if qualities else 95
+    details = [d for d in values("image_detail") if d in DETAIL_LEVELS]
+    detail = max(details, key=DETAIL_LEVELS.index) if details else None
+    return max_edge, jpeg_quality, detail
+
+
+class MediaEncoder:
+    """
+    Encodes the frames of one video, each (frame path, max edge, quality) once, so that batches,
+    chunks and retries sharing a frame reuse the same base64 string.
+    """
+
+    def __init__(self):
+        self._encoded = {}
+        self._timestamps = {}
+        self._lock = threading.Lock()
+
+    def encode_image(self, img_path: str, max_edge: int = None, jpeg_quality: int = 95) -> str:
+        key = (img_path, max_edge, jpeg_quality)
+        with self._lock:
+            encoded = self._encoded.get(key)
+        if encoded is None:
+            encoded = encode_image(img_path, max_edge, jpeg_quality)
+            with self._lock:
+                self._encoded[key] = encoded
+        return encoded
+
+    def frame_timestamp(self, img_path: str):
+        """Timestamp (s) of an extracted frame, read from the manifest of its extraction cache entry (None if unknown)."""
+        method_dir = os.path.dirname(img_path)
+        with self._lock:
+            timestamps = self._timestamps.get(method_dir)
+        if timestamps is None:
+            try:
+                with open(os.path.join(method_dir, "manifest.json"), "r", encoding="utf-8") as f:
+                    timestamps = json.load(f).get("timestamps", {})
+            except (OSError, ValueError):
+                timestamps = {}
+            with self._lock:
+                self._timestamps[method_dir] = timestamps
+        return timestamps.get(os.path.basename(img_path))
+
+    def encode_grid(self, img_paths: List[str], rows: int, cols: int, tile_width: int = 512, labels: bool = True,
+                    max_edge: int = None, jpeg_quality: int = 95) -> str:
+        """Tile up to rows x cols frames into one image (labelled with their timestamps) and encode it."""
+        key = (tuple(img_paths), rows, cols, tile_width, labels, max_edge, jpeg_quality)
+        with self._lock:
+            encoded = self._encoded.get(key)
+        if encoded is None:
+            images = [cv2.imread(p) for p in img_paths]
+            if any(image is None for image in images):
+                raise ValueError(f"Failed to read images: {img_paths}")
+            texts = None
+            if labels:
+                texts = [f"{ts:.1f}s" if (ts := self.frame_timestamp(p)) is not None else "" for p in img_paths]
+            grid = tile_images(images, rows, cols, tile_width, texts)
+            encoded = encode_array(grid, max_edge, jpeg_quality)
+            with self._lock:
+                self._encoded[key] = encoded
+        return encoded
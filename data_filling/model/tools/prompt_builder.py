@@ -1,14 +1,49 @@
+from functools import lru_cache
 from typing import List, Dict, Tuple
+import base64
 import json
+import math
 import tiktoken
+from data_filling.model.tools.media_encoder import jpeg_size
 
+# Base64 characters decoded to read an image's JPEG header (48 KiB of data)
+_HEADER_CHARS = 65536
 
-def estimate_tokens_from_messages(messages: List[Dict], model: str = "gpt-4") -> int:
 
+@lru_cache(maxsize=None)
+def _get_encoding(model: str):
     try:
-        enc = tiktoken.encoding_for_model(model)
+        return tiktoken.encoding_for_model(model)
     except KeyError:
-        enc = tiktoken.get_encoding("cl100k_base")
+        return tiktoken.get_encoding("cl100k_base")
+
+
+@lru_cache(maxsize=8192)
+def _count_tokens(text: str, model: str) -> int:
+    return len(_get_encoding(model).encode(text))
+
+
+def image_token_estimate(image_b64: str, detail: str = None, default: int = 100) -> int:
+    """
+    Estimated prompt tokens of one base64 JPEG sent with the given vision `detail`, following
+    OpenAI's rule: 85 at low detail, otherwise 85 + 170 per 512px tile once the image is scaled to
+    fit 2048x2048 with its short side at most 768 ("auto" is counted as "high").
+    Without a detail, or when the JPEG size cannot be read, the flat `default` cost is used.
+    """
+    if detail == "low":
+        return 85
+    size = jpeg_size(base64.b64decode(image_b64[:_HEADER_CHARS])) if detail else None
+    if size is None:
+        return default
+    width, height = size
+    scale = min(1.0, 2048 / max(width, height))
+    scale *= min(1.0, 768 / (min(width, height) * scale))
+    return 85 + 170 * math.ceil(width * scale / 512) * math.ceil(height * scale / 512)
+
+
+def estimate_tokens_from_messages(messages: List[Dict], model: str = "gpt-4", image_tokens: int = 100) -> int:
+
+    enc = _get_encoding(model)
 
     total = 0
     for m in messages:
@@ -20,25 +55,21 @@ def estimate_tokens_from_messages(messages: List[Dict], model: str = "gpt-4") ->
                 if part["type"] == "text":
                     total += len(enc.encode(part["text"]))
                 elif part["type"] == "image_url":
-                    total += 100  # OpenAI estimate: 85–120 tokens per image
+                    image_url = part["image_url"]
+                    total += image_token_estimate(
+                        image_url["url"].split(",", 1)[-1], image_url.get("detail"), image_tokens
+                    )
     return total
 
 
-def build_prompt_messages(
-    fields_dict: Dict,
-    images_b64: List[str],
-    transcriptions: List[str] = None
-) -> List[Dict]:
-
-    fields = {
-        k: {
-            "description": v["prompt_ai"],
-            "accepted_values": v.get("accepted_values", [])
-        }
-        for k, v in fields_dict.items()
+def _field_spec(val: Dict) -> Dict:
+    return {
+        "description": val["prompt_ai"],
+        "accepted_values": val.get("accepted_values", [])
     }
 
-    # Prompt system avec détection de sources
+
+def _prompt_sources(images_b64: List[str], transcriptions: List[str]) -> List[str]:
     sources = []
     if images_b64:
         sources.append("frames")
@@ -47,7 +78,11 @@ def build_prompt_messages(
 
     if not sources:
         raise ValueError("At least one of images or transcriptions must be provided.")
+    return sources
+
 
+def _system_prompt_prefix(sources: List[str], transcriptions: List[str]) -> str:
+    """System prompt up to (and including) "Fields:\n", followed by the fields JSON."""
     system_prompt = (
         "You are an expert in marketing analysis for alcoholic beverage products.\n"
         f"You are given {', and '.join(sources)} from an advertisement.\n"
@@ -55,15 +90,32 @@ def build_prompt_messages(
 
     if transcriptions:
         system_prompt += "Transcription:\n" + "\n".join(transcriptions[:1]) + "\n\n"
-        print("transcriptions",transcriptions)
 
     system_prompt += (
         "Your task is to extract structured information based on the provided material.\n"
         "Return a valid JSON dictionary with key: value pairs.\n"
         "Use only the keys and descriptions provided below. If a value is not identifiable, return 'N/A'.\n"
         "Respond only with the JSON object: {key: value, ...}.\n\n"
-        f"Fields:\n{json.dumps(fields)}"
+        "Fields:\n"
     )
+    return system_prompt
+
+
+def build_prompt_messages(
+    fields_dict: Dict,
+    images_b64: List[str],
+    transcriptions: List[str] = None,
+    image_detail: str = None
+) -> List[Dict]:
+
+    fields = {k: _field_spec(v) for k, v in fields_dict.items()}
+
+    # Prompt system avec détection de sources
+    sources = _prompt_sources(images_b64, transcriptions)
+    if transcriptions:
+        print("transcriptions",transcriptions)
+
+    system_prompt = _system_prompt_prefix(sources, transcriptions) + json.dumps(fields)
 
     user_content = [{"type": "text", "text": f"Here {' and '.join(sources)}:"}]
     if images_b64:
@@ -71,6 +123,9 @@ def build_prompt_messages(
             {"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}}
             for b64 in images_b64
         ]
+        if image_detail:
+            for part in user_content[1:]:
+                part["image_url"]["detail"] = image_detail
 
     return [
         {"role": "system", "content": system_prompt},
@@ -78,6 +133,118 @@ def build_prompt_messages(
     ]
 
 
+def _base_tokens(images_b64: List[str], transcriptions: List[str], model: str, image_detail: str = None,
+                 image_tokens: int = 100) -> int:
+    """Tokens of a prompt without its fields JSON (same count as estimate_tokens_from_messages)."""
+    sources = _prompt_sources(images_b64, transcriptions)
+    return (
+        _count_tokens(_system_prompt_prefix(sources, transcriptions), model)
+        + _count_tokens(f"Here {' and '.join(sources)}:", model)
+        + sum(image_token_estimate(b64, image_detail, image_tokens) for b64 in images_b64 or [])
+    )
+
+
+def _field_costs(prompt_data: Dict, model: str) -> Dict[str, Tuple[int, int, int, int]]:
+    """
+    Token cost of each field inside the fields JSON, as (only, first, middle, last) field.
+    The tokenizer splits text into pieces before BPE, and `json.dumps` output always breaks
+    into pieces after "Fields:\n" and after each ", " separator (the comma ends the previous
+    field's piece), so the JSON costs exactly the sum of its fields' costs:
+    "{" + f1 + "," | " " + f2 + "," | ... | " " + fn + "}"  (or "{" + f1 + "}" for a single field).
+    """
+    costs = {}
+    for key, val in prompt_data.items():
+        entry = json.dumps({key: _field_spec(val)})[1:-1]
+        costs[key] = (
+            _count_tokens("{" + entry + "}", model),
+            _count_tokens("{" + entry + ",", model),
+            _count_tokens(" " + entry + ",", model),
+            _count_tokens(" " + entry + "}", model),
+        )
+    return costs
+
+
+def _pack_fields(prompt_data: Dict, costs: Dict, base_tokens: int, max_tokens: int, label: str = None) -> List[Dict]:
+    """
+    Greedily group fields in template order while the prompt fits in `max_tokens`
+    (a field too large on its own gets its own group), summing precomputed costs.
+    """
+    groups = []
+    current_fields = {}
+    current_tokens = 0  # cost of the current fields, none of them being the last one
+
+    for key, val in prompt_data.items():
+        only, first, middle, last = costs[key]
+        token_estimate = base_tokens + (current_tokens + last if current_fields else only)
+        if label is not None:
+            print(f"Estimated tokens{label} with {key} ({len(current_fields) + 1} fields): {token_estimate}")
+
+        if token_estimate > max_tokens:
+            if not current_fields:
+                groups.append({key: val})
+            else:
+                groups.append(current_fields)
+                current_fields = {key: val}
+                current_tokens = first
+        else:
+            current_tokens += middle if current_fields else first
+            current_fields[key] = val
+
+    if current_fields:
+        groups.append(current_fields)
+    return groups
+
+
+def _fields_tokens(keys: List[str], costs: Dict) -> int:
+    """Exact token cost of the fields JSON for `keys`, in this order."""
+    if len(keys) == 1:
+        return costs[keys[0]][0]
+    return costs[keys[0]][1] + sum(costs[k][2] for k in keys[1:-1]) + costs[keys[-1]][3]
+
+
+def _bin_pack_fields(prompt_data: Dict, costs: Dict, base_tokens: int, max_tokens: int) -> List[Dict]:
+    """
+    First-fit decreasing packing of fields into as few groups as possible. Each field is sized by
+    its largest positional cost, so a group never exceeds `max_tokens` whatever its field order.
+    Fields keep their template order within and across groups.
+    """
+    capacity = max_tokens - base_tokens
+    position = {key: i for i, key in enumerate(prompt_data)}
+    bins = []  # [used tokens, keys]
+
+    for key in sorted(prompt_data, key=lambda k: max(costs[k]), reverse=True):
+        size = max(costs[key])
+        for group in bins:
+            if group[0] + size <= capacity:
+                group[0] += size
+                group[1].append(key)
+                break
+        else:
+            bins.append([size, [key]])
+
+    groups = sorted((sorted(keys, key=position.get) for _, keys in bins), key=lambda keys: position[keys[0]])
+    return [{key: prompt_data[key] for key in keys} for keys in groups]
+
+
+def _plan_fields(prompt_data: Dict, costs: Dict, base_tokens: int, max_tokens: int, bin_packing: bool,
+                 label: str = None) -> List[Dict]:
+    groups = _pack_fields(prompt_data, costs, base_tokens, max_tokens, label)
+    if bin_packing:
+        packed = _bin_pack_fields(prompt_data, costs, base_tokens, max_tokens)
+        # Sizes are conservative, keep the template-order grouping when it is already as small
+        if len(packed) < len(groups):
+            return packed
+    return groups
+
+
+def estimate_chunks_tokens(chunks: List[Tuple[Dict, List[str], List[str]]], model: str = "gpt-4",
+                           image_detail: str = None, image_tokens: int = 100) -> int:
+    """Estimated prompt tokens of all chunks (same count as estimate_tokens_from_messages on each)."""
+    total = 0
+    for fields, images, transcript in chunks:
+        costs = _field_costs(fields, model)
+        total += _base_tokens(images, transcript, model, image_detail, image_tokens) + _fields_tokens(list(fields), costs)
+    return total
 
 
 def smart_split_prompt(
@@ -88,88 +255,45 @@ def smart_split_prompt(
     model: str = "gpt-4",
     max_images_per_chunk: int = 6,
     max_chunks: int = 10,
-    split_image: bool = True
+    split_image: bool = True,
+    bin_packing: bool = False,
+    image_detail: str = None,
+    image_tokens: int = 100
 ) -> List[Tuple[Dict, List[str], List[str]]]:
+    """
+    Split fields (and images) into chunks fitting in `max_tokens`.
+    With `bin_packing`, fields are bin-packed (see `_bin_pack_fields`) instead of grouped in template order.
+    Images are counted as they will be sent with `image_detail` (see `image_token_estimate`,
+    `image_tokens` being the cost of images of unknown size).
+    """
 
     all_chunks = []
     transcript = transcriptions if transcriptions else []
+    # Each field is tokenized once, chunks are then packed by summing costs
+    costs = _field_costs(prompt_data, model)
 
     # Cas 1 : pas de split d’images
     if not split_image:
         images_b64 = images_b64[:max_images_per_chunk] if images_b64 else []
-        current_fields = {}
-
-        for key, val in prompt_data.items():
-            test_fields = {**current_fields, key: val}
-            token_estimate = estimate_tokens_from_messages(
-                build_prompt_messages(test_fields, images_b64, transcript),
-                model
-            )
-            print(f"Estimated tokens for {list(test_fields.keys())}: {token_estimate}")
-
-            if token_estimate > max_tokens:
-                if not current_fields:
-                    all_chunks.append(({key: val}, images_b64, transcript))
-                else:
-                    all_chunks.append((current_fields.copy(), images_b64, transcript))
-                    current_fields = {key: val}
-            else:
-                current_fields[key] = val
-
-        if current_fields:
-            all_chunks.append((current_fields.copy(), images_b64, transcript))
+        base_tokens = _base_tokens(images_b64, transcript, model, image_detail, image_tokens)
+        for fields in _plan_fields(prompt_data, costs, base_tokens, max_tokens, bin_packing, label=""):
+            all_chunks.append((fields, images_b64, transcript))
         return all_chunks
 
     # Cas ou y a que l'audio
     if not images_b64:
-        current_fields = {}
-        for key, val in prompt_data.items():
-            test_fields = {**current_fields, key: val}
-            token_estimate = estimate_tokens_from_messages(
-                build_prompt_messages(test_fields, [], transcript),
-                model
-            )
-            print(f"Estimated tokens (audio only) for {list(test_fields.keys())}: {token_estimate}")
-
-            if token_estimate > max_tokens:
-                if not current_fields:
-                    all_chunks.append(({key: val}, [], transcript))
-                else:
-                    all_chunks.append((current_fields.copy(), [], transcript))
-                    current_fields = {key: val}
-            else:
-                current_fields[key] = val
-
-        if current_fields:
-            all_chunks.append((current_fields.copy(), [], transcript))
+        base_tokens = _base_tokens([], transcript, model)
+        for fields in _plan_fields(prompt_data, costs, base_tokens, max_tokens, bin_packing, label=" (audio only)"):
+            all_chunks.append((fields, [], transcript))
         return all_chunks
 
     # Cas 2 : split des images, transcription inchangée
     total_images = len(images_b64) if images_b64 else 0
     for i in range(0, total_images, max_images_per_chunk):
         image_chunk = images_b64[i:i + max_images_per_chunk]
-        current_fields = {}
-        field_chunks = []
-
-        for key, val in prompt_data.items():
-            test_fields = {**current_fields, key: val}
-            token_estimate = estimate_tokens_from_messages(
-                build_prompt_messages(test_fields, image_chunk, transcript),
-                model
-            )
-            if token_estimate > max_tokens:
-                if not current_fields:
-                    field_chunks.append(({key: val}, image_chunk, transcript))
-                else:
-                    field_chunks.append((current_fields.copy(), image_chunk, transcript))
-                    current_fields = {key: val}
-            else:
-                current_fields[key] = val
-
-        if current_fields:
-            field_chunks.append((current_fields.copy(), image_chunk, transcript))
-
-        all_chunks.extend(field_chunks)
+        base_tokens = _base_tokens(image_chunk, transcript, model, image_detail, image_tokens)
+        for fields in _plan_fields(prompt_data, costs, base_tokens, max_tokens, bin_packing):
+            all_chunks.append((fields, image_chunk, transcript))
 
     if len(all_chunks) > max_chunks:
         print(f"❌ Skipping prompt: {len(all_chunks)} chunks needed (max allowed is {max_chunks}).")
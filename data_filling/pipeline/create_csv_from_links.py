@@ -3,11 +3,14 @@
 import os
 import json
 import pandas as pd
-import uuid
+import threading
 from data_filling.model.multi_input_gptmodel import GPTMultiColumnModel
-from data_filling.pipeline.tools_pipeline.extract_framings import extract_all_framings
-from data_filling.pipeline.tools_pipeline.utils import ensure_dir, normalize_filename, find_brand_knowledge_path
-from data_filling.pipeline.tools_pipeline.download_video_from_url import download_video, clean_folder_if_needed
+from data_filling.pipeline.tools_pipeline.staged_pipeline import run_staged_pipeline
+from data_filling.pipeline.tools_pipeline.utils import ensure_dir, resolve_brand_knowledge, template_version
+from data_filling.pipeline.tools_pipeline.run_journal import RunJournal, job_key
+from data_filling.pipeline.tools_pipeline.result_writer import ResultWriter
+from data_filling.pipeline.tools_pipeline.dedup import VideoDeduplicator, video_fingerprint
+from data_filling.pipeline.tools_pipeline.download_video_from_url import download_video
 from data_filling.model.agent.brand_knowledge_agent import BrandKnowledgeAgent
 
 def process_from_links(conf: dict):
@@ -26,63 +29,166 @@ def process_from_links(conf: dict):
     model = GPTMultiColumnModel(conf)
     agent = BrandKnowledgeAgent(conf)
 
-    df = pd.read_csv(input_csv_path)
-    results = []
+    with open(conf["template_path"], "r", encoding="utf-8") as f:
+        template = json.load(f)
+    key_map = {v["key"]: k for k, v in template.items()}
+    keep_downloads = conf.get("keep_downloaded_videos", True)
+    brand_lock = threading.Lock()
 
-    for i, row in df.iterrows():
-        url = str(row.get(url_col, "")).strip()
-        brand = str(row.get(brand_col, "")).strip()
-        unique_id = str(uuid.uuid4())
-        video_path = os.path.join(download_dir, f"{unique_id}.mp4")
+    # Completed rows are journaled as they finish: a restarted run only processes the remaining ones
+    version = conf.get("template_version") or template_version(template)
+    journal = RunJournal(conf.get("journal_path") or os.path.join(output_dir, "run_journal.jsonl"))
+    if len(journal):
+        print(f"📒 Resuming from journal: {len(journal)} completed row(s)")
 
-        if not url:
-            print(f"❌ No URL found in row {i}, skipping...")
-            continue
-
-        print(f"\n⬇️ Downloading video {i+1}/{len(df)}: {url}")
+    # Results are written as they complete (previously journaled ones first), in template column order
+    output_csv = os.path.join(output_dir, "com_case_poc_test.csv")
+    ordered_columns = ["video_id", "video_url", "brand"] + list(template.keys())
+    writer = ResultWriter(
+        output_csv, ordered_columns,
+        parquet_path=conf.get("output_parquet_path"),
+        flush_rows=conf.get("output_flush_rows", 50),
+        flush_seconds=conf.get("output_flush_seconds", 30),
+    )
+
+    # Copies of an already tagged creative (other URL, re-upload, re-encode) reuse its results
+    dedup = None
+    if conf.get("dedup", True):
+        dedup = VideoDeduplicator(
+            conf.get("dedup_db_path") or os.path.join(output_dir, "dedup.sqlite"),
+            max_distance=int(conf.get("dedup_max_distance", 8)),
+            min_frames=int(conf.get("dedup_min_frames", 3)),
+            duration_tolerance=float(conf.get("dedup_duration_tolerance", 0.5)),
+        )
+    dedup_samples = int(conf.get("dedup_samples", 5))
+    fingerprints = {}  # video path -> fingerprint, until the video is tagged
+    fingerprints_lock = threading.Lock()
+    dedup_counts = {"videos": 0, "hits": 0}
+
+    in_flight = set()  # keys queued and not completed yet (bounded by the pipeline queues, plus failed rows)
+    in_flight_lock = threading.Lock()
+
+    def complete(key, result):
+        journal.append(key, result)
+        writer.write(result)
+        with in_flight_lock:
+            in_flight.discard(key)
+
+    def reuse_duplicate(job, scope, fingerprint) -> bool:
+        """Complete a row from the results of an already tagged copy of its video, if any."""
+        i, url, brand, key = job
+        duplicate = dedup.lookup(scope, fingerprint)
+        if duplicate is None:
+            return False
+        print(f"🔁 Duplicate of {duplicate['video_url']}, reusing its results for: {url}")
+        complete(key, {**duplicate, "video_id": key[:16], "video_url": url, "brand": brand})
+        with fingerprints_lock:
+            dedup_counts["hits"] += 1
+        return True
+
+    def download(job):
+        i, url, brand, key = job
+        # Stable id: the same row gets the same video id (and file names) on every run
+        video_path = os.path.join(download_dir, f"{key[:16]}.mp4")
+
+        print(f"\n⬇️ Downloading video of row {i+1}: {url}")
         try:
             download_video(url, video_path)
         except Exception as e:
             print(f"❌ Failed to download video: {e}")
-            continue
-
-        # Extract frames & audio
-        video_id, frame_paths_by_method = extract_all_framings(video_path, output_dir)
-
-        # Brand knowledge
-        brand_knowledge_path = None
-        if brand:
-            brand_knowledge_path = find_brand_knowledge_path(brand, brands_knowledge_dir)
-            if not brand_knowledge_path:
-                print(f"⚠️ No knowledge file for '{brand}', generating one...")
-                brand_info = agent.generate_knowledge(brand)
-                if brand_info:
-                    filename = normalize_filename(brand) + ".json"
-                    save_path = os.path.join(brands_knowledge_dir, filename)
-                    with open(save_path, "w", encoding="utf-8") as f:
-                        json.dump(brand_info, f, indent=2, ensure_ascii=False)
-                    brand_knowledge_path = save_path
-
-        # Predict
-        print(f"🚀 Running model on: {video_id} for brand: {brand or 'No brand'}")
-        result_dict = model.predict(frame_paths_by_method, brand_knowledge_path=brand_knowledge_path)
-
-        # Remap keys
-        with open(conf["template_path"], "r", encoding="utf-8") as f:
-            template = json.load(f)
-        key_map = {v["key"]: k for k, v in template.items()}
-        remapped_result = {key_map.get(k, k): v for k, v in result_dict.items()}
-        remapped_result.update({"video_id": video_id, "video_url": url, "brand": brand})
-
-        results.append(remapped_result)
-
-        clean_folder_if_needed(os.path.join(output_dir, "extracted_frames", video_id))
-
-    # Export CSV
-    output_csv = os.path.join(output_dir, "com_case_poc_test.csv")
-    df_out = pd.DataFrame(results)
-    ordered_columns = ["video_id", "video_url", "brand"] + list(template.keys())
-    df_out = df_out.reindex(columns=ordered_columns)
-    df_out.to_csv(output_csv, index=False, encoding="utf-8")
-
+            return None
+
+        if dedup is not None:
+            fingerprint = video_fingerprint(video_path, dedup_samples)
+            with fingerprints_lock:
+                dedup_counts["videos"] += 1
+            # Known duplicates skip extraction and LLM calls
+            if reuse_duplicate(job, VideoDeduplicator.scope(brand, version), fingerprint):
+                if not keep_downloads:
+                    os.remove(video_path)
+                return None
+            with fingerprints_lock:
+                fingerprints[video_path] = fingerprint
+        return video_path
+
+    def handle(job, video_path, video_id, frame_paths_by_method):
+        i, url, brand, key = job
+        with fingerprints_lock:
+            fingerprint = fingerprints.pop(video_path, None)
+        scope = VideoDeduplicator.scope(brand, version)
+
+        # A copy downloaded at the same time may have been tagged while this one was extracted
+        if fingerprint is None or not reuse_duplicate(job, scope, fingerprint):
+            # Brand knowledge (generated once even if several videos of the same brand are in flight)
+            brand_knowledge_path = None
+            if brand:
+                with brand_lock:
+                    brand_knowledge_path = resolve_brand_knowledge(brand, brands_knowledge_dir, agent)
+
+            # Predict
+            print(f"🚀 Running model on: {video_id} for brand: {brand or 'No brand'}")
+            result_dict = model.predict(frame_paths_by_method, brand_knowledge_path=brand_knowledge_path)
+
+            # Remap keys
+            remapped_result = {key_map.get(k, k): v for k, v in result_dict.items()}
+            remapped_result.update({"video_id": video_id, "video_url": url, "brand": brand})
+
+            complete(key, remapped_result)
+            if fingerprint is not None:
+                dedup.add(scope, fingerprint, remapped_result)
+
+        if not keep_downloads and os.path.exists(video_path):
+            os.remove(video_path)
+
+    def rows():
+        # The input is read in chunks of `csv_chunk_size` rows, never loaded whole
+        chunks = pd.read_csv(input_csv_path, chunksize=max(1, int(conf.get("csv_chunk_size", 10000))))
+        for i, row in (item for chunk in chunks for item in chunk.iterrows()):
+            url = str(row.get(url_col, "")).strip()
+            brand = str(row.get(brand_col, "")).strip()
+            if not url:
+                print(f"❌ No URL found in row {i}, skipping...")
+                continue
+            yield i, url, brand, job_key(url, brand, version)
+
+    counts = {"queued": 0, "resumed": 0, "duplicates": 0}
+
+    def pending_rows():
+        # Repeated rows are found through the journal and the rows in flight, no per-row set is kept
+        for job in rows():
+            key = job[3]
+            with in_flight_lock:
+                if key in in_flight:
+                    counts["duplicates"] += 1
+                    continue
+            resumed = journal.take(key)
+            if resumed is not None:
+                writer.write(resumed)
+                counts["resumed"] += 1
+                continue
+            if key in journal:
+                counts["duplicates"] += 1
+                continue
+            with in_flight_lock:
+                in_flight.add(key)
+            counts["queued"] += 1
+            yield job
+
+    # Download, extraction and prediction run as concurrent stages with bounded queues
+    try:
+        run_staged_pipeline(pending_rows(), download, handle, output_dir, conf)
+    finally:
+        # Also on failure: flushes the buffered rows and writes the Parquet footer
+        writer.close()
+        journal.close()
+
+    print(f"⏭️ {counts['resumed']} row(s) reused from the journal, {counts['duplicates']} duplicate row(s) skipped")
+    if dedup_counts["videos"]:
+        rate = 100 * dedup_counts["hits"] / dedup_counts["videos"]
+        print(f"🔁 Dedup: {dedup_counts['hits']}/{dedup_counts['videos']} downloaded video(s) reused "
+              f"from a duplicate ({rate:.0f}% hit rate)")
+    failed = counts["queued"] + counts["resumed"] - writer.rows_written
+    if failed:
+        print(f"⚠️ {failed} row(s) failed and are not in the CSV, run again to retry them")
     print(f"✅ Final results saved to: {output_csv}")
+    model.report_cache_stats()
@@ -3,8 +3,8 @@
 import os
 import json
 from data_filling.model.multi_input_gptmodel import GPTMultiColumnModel
-from data_filling.pipeline.tools_pipeline.extract_framings import extract_all_framings
-from data_filling.pipeline.tools_pipeline.utils import ensure_dir, normalize_filename, find_brand_knowledge_path
+from data_filling.pipeline.tools_pipeline.parallel_extraction import iter_extractions
+from data_filling.pipeline.tools_pipeline.utils import ensure_dir, resolve_brand_knowledge
 from data_filling.model.agent.brand_knowledge_agent import BrandKnowledgeAgent
 
 def process_all_videos(conf: dict):
@@ -28,22 +28,14 @@ def process_all_videos(conf: dict):
         if f.lower().endswith((".mp4", ".mov"))
     ]
 
-    for video_path in video_files:
-        video_id, frame_paths_by_method = extract_all_framings(video_path, output_dir)
+    # Videos are extracted in parallel when `extraction_workers` > 1 and predicted as they finish
+    jobs = ((None, video_path) for video_path in video_files)
+    for _, video_path, video_id, frame_paths_by_method in iter_extractions(jobs, output_dir, conf):
         brand_name = video_to_brand.get(video_id)
         brand_knowledge_path = None
 
         if brand_name:
-            brand_knowledge_path = find_brand_knowledge_path(brand_name, brands_knowledge_dir)
-            if not brand_knowledge_path:
-                print(f"⚠️ No knowledge file for '{brand_name}', generating one...")
-                brand_info = agent.generate_knowledge(brand_name)
-                if brand_info:
-                    filename = normalize_filename(brand_name) + ".json"
-                    save_path = os.path.join(brands_knowledge_dir, filename)
-                    with open(save_path, "w", encoding="utf-8") as f:
-                        json.dump(brand_info, f, indent=2, ensure_ascii=False)
-                    brand_knowledge_path = save_path
+            brand_knowledge_path = resolve_brand_knowledge(brand_name, brands_knowledge_dir, agent)
 
         print(f"\n🚀 Running model on video: {video_id} for brand: {brand_name or 'Unknown'}")
         results = model.predict(frame_paths_by_method, brand_knowledge_path=brand_knowledge_path)
@@ -55,3 +47,5 @@ def process_all_videos(conf: dict):
             json.dump(results, out, indent=2, ensure_ascii=False)
 
         print(f"✅ Saved results to {result_path}")
+
+    model.report_cache_stats()
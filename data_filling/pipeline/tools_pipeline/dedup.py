@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+import cv2
+import numpy as np
+from data_filling.pipeline.tools_pipeline.utils import file_hash
+
+
+# Frames flatter than this (grey level std) carry no usable signature: fades, black or solid frames
+_MIN_FRAME_STD = 8.0
+
+
+def frame_dhashes(video_path: str, samples: int = 5) -> Tuple[List[Optional[int]], float]:
+    """
+    Return the 64-bit difference hashes of `samples` frames taken at evenly spaced positions of the
+    video, and its duration in seconds. They survive re-encoding, rescaling and small quality changes,
+    unlike the byte hash. Near-uniform frames, whose hash is almost all zero bits whatever the video,
+    are returned as None.
+    """
+    cap = cv2.VideoCapture(video_path)
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    duration = total / fps if fps > 0 else 0.0
+    hashes = []
+    if cap.isOpened() and total > 0:
+        for k in range(samples):
+            cap.set(cv2.CAP_PROP_POS_FRAMES, int(total * (k + 1) / (samples + 1)))
+            ok, frame = cap.read()
+            if not ok:
+                break
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            if cv2.resize(gray, (64, 64), interpolation=cv2.INTER_AREA).std() < _MIN_FRAME_STD:
+                hashes.append(None)
+                continue
+            small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+            bits = (small[:, 1:] > small[:, :-1]).flatten()
+            hashes.append(int.from_bytes(np.packbits(bits).tobytes(), "big"))
+    cap.release()
+    return hashes, duration
+
+
+def video_fingerprint(video_path: str, samples: int = 5) -> Tuple[str, dict]:
+    """(byte hash, {"frames": frame dHashes, "duration": seconds}) of a video."""
+    frames, duration = frame_dhashes(video_path, samples)
+    return file_hash(video_path), {"frames": frames, "duration": round(duration, 3)}
+
+
+class VideoDeduplicator:
+    """
+    Persistent index of tagged videos by content fingerprint, in a SQLite file shared by threads.
+
+    A video matches an indexed one of the same scope (brand + template version) when their
+    bytes are identical, or when they look the same (same creative served by another CDN,
+    re-uploaded or re-encoded): durations within `duration_tolerance`, the same sampled frames
+    uniform in both, and all the others within `max_distance` bits, at least `min_frames` of them
+    informative (neither uniform nor with a nearly empty hash).
+    """
+
+    def __init__(self, path: str, max_distance: int = 8, min_frames: int = 3, duration_tolerance: float = 0.5):
+        """
+        :param path: SQLite file (created if missing)
+        :param max_distance: Maximum Hamming distance (out of 64 bits) between two sampled frames
+        :param min_frames: Minimum number of informative matching frames
+        :param duration_tolerance: Maximum duration difference, in seconds (or 2% of the duration if larger)
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_distance = max_distance
+        self.min_frames = min_frames
+        self.duration_tolerance = duration_tolerance
+        self._frames = {}  # scope -> [(signature, rowid)], loaded on first lookup
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fingerprints ("
+                "scope TEXT NOT NULL, byte_hash TEXT NOT NULL, dhashes TEXT NOT NULL, "
+                "result TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS fingerprints_bytes ON fingerprints (scope, byte_hash)")
+
+    @staticmethod
+    def scope(brand: str, version: str) -> str:
+        return hashlib.sha256(f"{brand}\n{version}".encode("utf-8")).hexdigest()
+
+    def _scope_frames(self, scope: str) -> list:
+        frames = self._frames.get(scope)
+        if frames is None:
+            rows = self._conn.execute("SELECT dhashes, rowid FROM fingerprints WHERE scope = ?", (scope,))
+            frames = []
+            for dhashes, rowid in rows:
+                signature = json.loads(dhashes)
+                # Rows indexed before durations were stored only match by bytes
+                if isinstance(signature, dict):
+                    frames.append((signature, rowid))
+            self._frames[scope] = frames
+        return frames
+
+    def _similar(self, a: dict, b: dict) -> bool:
+        tolerance = max(self.duration_tolerance, 0.02 * max(a["duration"], b["duration"]))
+        if not a["duration"] or abs(a["duration"] - b["duration"]) > tolerance:
+            return False
+        if len(a["frames"]) != len(b["frames"]):
+            return False
+        compared = 0
+        for x, y in zip(a["frames"], b["frames"]):
+            if x is None or y is None:
+                if x is not y:
+                    return False  # uniform in one video only
+                continue
+            if bin(x ^ y).count("1") > self.max_distance:
+                return False
+            # Two hashes with at most max_distance / 2 bits set (or unset), e.g. logos on a plain
+            # background, always match: such frames must match but do not count
+            if self._informative(x) and self._informative(y):
+                compared += 1
+        return compared >= self.min_frames
+
+    def _informative(self, dhash: int) -> bool:
+        half = self.max_distance // 2
+        return half < bin(dhash).count("1") < 64 - half
+
+    def lookup(self, scope: str, fingerprint: Tuple[str, dict]) -> Optional[dict]:
+        """Return the result of an indexed duplicate of the video, or None."""
+        byte_hash, signature = fingerprint
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM fingerprints WHERE scope = ? AND byte_hash = ? LIMIT 1", (scope, byte_hash)
+            ).fetchone()
+            if row is None:
+                rowid = next((r for indexed, r in self._scope_frames(scope) if self._similar(indexed, signature)), None)
+                if rowid is not None:
+                    row = self._conn.execute("SELECT result FROM fingerprints WHERE rowid = ?", (rowid,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def add(self, scope: str, fingerprint: Tuple[str, dict], result: dict):
+        byte_hash, signature = fingerprint
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO fingerprints (scope, byte_hash, dhashes, result, created) VALUES (?, ?, ?, ?, ?)",
+                (scope, byte_hash, json.dumps(signature), json.dumps(result, ensure_ascii=False), time.time())
+            )
+            if scope in self._frames:
+                self._frames[scope].append((signature, cursor.lastrowid))
@@ -3,59 +3,242 @@ from frame_extractors.mif_extractor import MIFExtractor
 from frame_extractors.face_extractor import PeopleExtractor
 from frame_extractors.regrouped_extractor import RegroupedExtractor
 from frame_extractors.people_mif_extractor import PeopleMIFExtractor
-from data_filling.pipeline.tools_pipeline.utils import ensure_dir
+from frame_extractors.frame_source import VideoFrameSource
+from frame_extractors.person_detections import PersonDetectionStage
+from frame_extractors.model_registry import get_detector
+from data_filling.pipeline.tools_pipeline.utils import file_hash
+from data_filling.pipeline.tools_pipeline.extraction_cache import ExtractionCache
 from audio_extractors.basic_audio_extractor import BasicAudioExtractor
+from collections.abc import Mapping
+from typing import Iterable
 import os
+import threading
 
+FRAME_METHODS = ("regular_1s", "regular_0_5s", "mif", "people_1s", "people_0_5s", "people_mif", "regroup_1s")
+PEOPLE_METHODS = {"people_1s", "people_0_5s", "people_mif"}
+ALL_METHODS = set(FRAME_METHODS) | {"audio"}
 
+# Extractor and parameters of every method; bump EXTRACTION_VERSION when extractor code changes its output
+EXTRACTION_VERSION = 3
+_EXTRACTORS = {
+    "regular_1s": (RegularExtractor, {"interval_s": 1.0}),
+    "regular_0_5s": (RegularExtractor, {"interval_s": 0.5}),
+    "mif": (MIFExtractor, {"max_frames": 10}),
+    "people_1s": (PeopleExtractor, {"interval_s": 1.0}),
+    "people_0_5s": (PeopleExtractor, {"interval_s": 0.5}),
+    "people_mif": (PeopleMIFExtractor, {"max_frames": 10, "interval_s": 0.5}),
+    "regroup_1s": (RegroupedExtractor, {"interval_s": 1.0, "max_output_images": 10}),
+    "audio": (BasicAudioExtractor, {"audio_format": "wav"}),
+}
 
 
 def get_video_id(video_path: str) -> str:
     return os.path.splitext(os.path.basename(video_path))[0]
 
-def extract_all_framings(video_path: str, output_dir: str) -> tuple:
-    video_id = get_video_id(video_path)
-    video_output_dir = os.path.join(output_dir, "extracted_frames", video_id)
-
-    if os.path.exists(video_output_dir):
-        print(f"📁 Using cached frames for video: {video_id}")
-        paths = {
-            method: [os.path.join(method_dir, f) for f in sorted(os.listdir(method_dir))]
-            for method in os.listdir(video_output_dir)
-            if os.path.isdir(method_dir := os.path.join(video_output_dir, method))
-        }
-    else:
-        print(f"🧪 Extracting frames and audio for video: {video_id}")
-        ensure_dir(video_output_dir)
-
-        paths = {
-            "regular_1s": RegularExtractor(interval_s=1.0).extract(
-                video_path, os.path.join(video_output_dir, "regular_1s")
-            ),
-            "regular_0_5s": RegularExtractor(interval_s=0.5).extract(
-                video_path, os.path.join(video_output_dir, "regular_0_5s")
-            ),
-            "mif": MIFExtractor(max_frames=10).extract(
-                video_path, os.path.join(video_output_dir, "mif")
-            ),
-            "people_1s": PeopleExtractor(interval_s=1.0).extract(
-                video_path, os.path.join(video_output_dir, "people_1s")
-            ),
-            "people_0_5s": PeopleExtractor(interval_s=0.5).extract(
-                video_path, os.path.join(video_output_dir, "people_0_5s")
-            ),
-            "people_mif": PeopleMIFExtractor(max_frames=10, interval_s=0.5).extract(
-                video_path, os.path.join(video_output_dir, "people_mif")
-            ),
-            "regroup_1s": RegroupedExtractor(interval_s=1.0, max_output_images=10).extract(
-                video_path, os.path.join(video_output_dir, "regroup_1s")
-            ),
-        }
-
-        # Audio extraction
-        audio_path = BasicAudioExtractor(audio_format="wav").extract(
-            video_path, os.path.join(video_output_dir, "audio")
-        )
-        paths["audio"] = [audio_path]
-
-    return video_id, paths
+
+def plan_methods(template: dict) -> set:
+    """
+    Return the framings a template needs: its `frame_method` and `audio` values,
+    plus regular_1s which `compute_frame_ratios` always uses.
+    """
+    methods = {"regular_1s"}
+    for conf in template.values():
+        for method in (conf.get("frame_method"), conf.get("audio")):
+            if method:
+                methods.add(method)
+
+    unknown = methods - ALL_METHODS
+    if unknown:
+        print(f"⚠️ Unknown framing method(s) in template: {', '.join(sorted(unknown))}")
+    return methods & ALL_METHODS
+
+
+def method_options(conf: dict) -> dict:
+    """Extractor parameters set in the config, as {method: {parameter: value}} (unset ones are left out)."""
+    options = {
+        "mif": {"diff_width": conf.get("mif_diff_width")},
+        "people_mif": {"selection": conf.get("people_mif_selection")},
+    }
+    return {method: {k: v for k, v in params.items() if v is not None} for method, params in options.items()}
+
+
+def _extractor_kwargs(method: str, regroup_max_width: int = None, options: dict = None) -> dict:
+    kwargs = dict(_EXTRACTORS[method][1])
+    kwargs.update((options or {}).get(method, {}))
+    if method == "regroup_1s":
+        kwargs["max_width"] = regroup_max_width
+    return kwargs
+
+
+def method_params(method: str, regroup_max_width: int = None, detector_weights: str = "yolov8n.pt",
+                  options: dict = None) -> dict:
+    """Everything that determines the output of a method, used as its extraction cache key."""
+    params = {
+        "extractor": _EXTRACTORS[method][0].__name__,
+        "version": EXTRACTION_VERSION,
+        **_extractor_kwargs(method, regroup_max_width, options),
+    }
+    if method in PEOPLE_METHODS:
+        params["detector"] = detector_weights
+    return params
+
+
+def _build_extractors(methods: set, detector=None, regroup_max_width: int = None, options: dict = None) -> tuple:
+    # Person detection runs once per frame for all people framings, and only if one is needed
+    detections = PersonDetectionStage(model=detector) if methods & PEOPLE_METHODS else None
+    extractors = {}
+    for method in methods:
+        extractor_cls = _EXTRACTORS[method][0]
+        kwargs = _extractor_kwargs(method, regroup_max_width, options)
+        if method in PEOPLE_METHODS:
+            kwargs["detections"] = detections
+        extractors[method] = extractor_cls(**kwargs)
+    return extractors, detections
+
+
+class LazyFramings(Mapping):
+    """
+    Read-only {method: frame paths} mapping of one video, restricted to the planned methods.
+    Methods are materialized on first access: those found in the extraction cache (by video
+    content hash and method parameters) are reused, and all the missing ones are extracted
+    together in a single decoding pass, then committed to the cache.
+    Picklable (the detector is not sent, it is reloaded from `detector_weights` when needed),
+    so extraction workers can return it.
+    """
+
+    def __init__(self, video_path: str, cache: ExtractionCache, methods: Iterable[str], detector=None,
+                 detector_weights: str = "yolov8n.pt", regroup_max_width: int = None, seek_min_gap_s: float = 2.0,
+                 options: dict = None):
+        self.video_path = video_path
+        self.cache = cache
+        self.methods = frozenset(methods)
+        self.detector_weights = detector_weights
+        self.regroup_max_width = regroup_max_width
+        self.seek_min_gap_s = seek_min_gap_s
+        self.options = options or {}
+        self._detector = detector
+        self._video_hash = None
+        self._paths = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_detector"] = None
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def __getitem__(self, method):
+        if method not in self.methods:
+            raise KeyError(method)
+        if method not in self._paths:
+            self.materialize()
+        return self._paths[method]
+
+    def __iter__(self):
+        return iter(sorted(self.methods))
+
+    def __len__(self):
+        return len(self.methods)
+
+    def _params(self, method: str) -> dict:
+        return method_params(method, self.regroup_max_width, self.detector_weights, self.options)
+
+    def materialize(self) -> "LazyFramings":
+        """Make every planned method available (reusing cached ones, extracting the others)."""
+        with self._lock:
+            if self._video_hash is None:
+                self._video_hash = file_hash(self.video_path)
+            missing, cached = set(), set()
+            for method in self.methods - set(self._paths):
+                manifest = self.cache.get(self._video_hash, method, self._params(method))
+                if manifest is not None:
+                    self._paths[method] = manifest["paths"]
+                    cached.add(method)
+                else:
+                    missing.add(method)
+
+            video_id = get_video_id(self.video_path)
+            if cached:
+                print(f"📁 Using cached {', '.join(sorted(cached))} for video: {video_id}")
+            if missing:
+                print(f"🧪 Extracting {', '.join(sorted(missing))} for video: {video_id}")
+                self._paths.update(self._extract(missing))
+        return self
+
+    def _extract(self, methods: set) -> dict:
+        paths = {}
+        tmp_dirs = {method: self.cache.new_tmp_dir(self._video_hash, method, self._params(method)) for method in methods}
+        try:
+            frame_methods = methods - {"audio"}
+            if frame_methods:
+                detector = self._detector
+                if detector is None and frame_methods & PEOPLE_METHODS:
+                    detector = get_detector(self.detector_weights)
+                # Every needed frame extractor is fed by a single decoding pass
+                extractors, detections = _build_extractors(
+                    frame_methods, detector, self.regroup_max_width, self.options
+                )
+                sources = {method: (extractor, tmp_dirs[method]) for method, extractor in extractors.items()}
+                if detections is not None:
+                    sources["person_detections"] = (detections, None)
+                frame_paths = VideoFrameSource(self.video_path, seek_min_gap_s=self.seek_min_gap_s).run(sources)
+                if not any(frame_paths[method] for method in extractors):
+                    # Unreadable video: nothing is cached, so a later run tries again
+                    print(f"⚠️ No frames extracted for video: {get_video_id(self.video_path)}")
+                    paths.update({method: [] for method in extractors})
+                    extractors = {}
+                for method, extractor in extractors.items():
+                    manifest = self.cache.commit(
+                        tmp_dirs.pop(method), self._video_hash, method, self._params(method),
+                        frame_paths[method], extractor.timestamps
+                    )
+                    paths[method] = manifest["paths"]
+
+            # Audio extraction
+            if "audio" in methods:
+                audio_path = BasicAudioExtractor(**_extractor_kwargs("audio")).extract(
+                    self.video_path, tmp_dirs["audio"]
+                )
+                manifest = self.cache.commit(
+                    tmp_dirs.pop("audio"), self._video_hash, "audio", self._params("audio"), [audio_path]
+                )
+                paths["audio"] = manifest["paths"]
+        finally:
+            # Folders of failed extractions are never committed
+            for tmp_dir in tmp_dirs.values():
+                self.cache.discard(tmp_dir)
+
+        return paths
+
+
+def extract_all_framings(video_path: str, output_dir: str, detector=None, regroup_max_width: int = None,
+                         methods: Iterable[str] = None, lazy: bool = False,
+                         detector_weights: str = "yolov8n.pt", cache: ExtractionCache = None,
+                         seek_min_gap_s: float = 2.0, options: dict = None) -> tuple:
+    """
+    Extract the framings and the audio of a video, reusing the extraction cache.
+    The timestamp of every saved frame is stored in the manifest of its cache entry.
+    :param detector: preloaded person detector shared by the people extractors (see get_detector)
+    :param regroup_max_width: downscale regroup_1s images wider than this (None = full width)
+    :param methods: framings to provide, e.g. `plan_methods(template)` (None = all of them)
+    :param lazy: return before extracting, methods are then extracted on first access
+    :param detector_weights: weights loaded when people framings are extracted without `detector`
+    :param cache: extraction cache (default: unbounded cache in `<output_dir>/extraction_cache`)
+    :param seek_min_gap_s: gap between wanted frames above which decoding seeks (see VideoFrameSource)
+    :param options: extractor parameters overriding the defaults, see `method_options`
+    :return: (video_id, LazyFramings)
+    """
+    if cache is None:
+        cache = ExtractionCache(os.path.join(output_dir, "extraction_cache"), max_gb=0)
+    framings = LazyFramings(
+        video_path, cache, ALL_METHODS if methods is None else methods,
+        detector=detector, detector_weights=detector_weights, regroup_max_width=regroup_max_width,
+        seek_min_gap_s=seek_min_gap_s, options=options
+    )
+    if not lazy:
+        framings.materialize()
+    return get_video_id(video_path), framings
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import Dict, Optional
+
+MANIFEST = "manifest.json"
+_TMP_MARKER = ".tmp-"
+
+
+def params_key(method: str, params: dict) -> str:
+    """Folder name of a (method, extractor parameters) entry, e.g. "regular_1s-3f2a9c0d1b7e"."""
+    content = json.dumps(params, sort_keys=True)
+    return f"{method}-{hashlib.sha256(content.encode('utf-8')).hexdigest()[:12]}"
+
+
+class ExtractionCache:
+    """
+    Content-addressed store of extracted framings: <root>/<video hash[:2]>/<video hash>/<method>-<params hash>/.
+
+    An entry is written in a temporary folder, completed by its manifest (files, timestamps, size)
+    and renamed into place, so a crash or a concurrent writer never leaves a partial entry that
+    looks valid. Using an entry refreshes its manifest mtime; once the cache exceeds `max_gb`,
+    the least recently used entries are evicted. Safe to share between processes.
+    """
+
+    _EVICT_EVERY = 20  # stores between two size checks
+
+    def __init__(self, root: str, max_gb: float = 20):
+        """
+        :param root: cache folder (created if missing)
+        :param max_gb: size budget in GB (0 = unbounded)
+        """
+        self.root = root
+        self.max_bytes = int(max_gb * 1024 ** 3) if max_gb else 0
+        self._stores = 0
+        os.makedirs(root, exist_ok=True)
+
+    def entry_dir(self, video_hash: str, method: str, params: dict) -> str:
+        return os.path.join(self.root, video_hash[:2], video_hash, params_key(method, params))
+
+    def get(self, video_hash: str, method: str, params: dict) -> Optional[dict]:
+        """
+        Return the manifest of a completed entry, with `paths` set to its files (None if missing).
+        A folder without a readable manifest is a leftover and is removed.
+        """
+        entry = self.entry_dir(video_hash, method, params)
+        manifest_path = os.path.join(entry, MANIFEST)
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            os.utime(manifest_path)
+        except FileNotFoundError:
+            if os.path.isdir(entry):
+                shutil.rmtree(entry, ignore_errors=True)
+            return None
+        except ValueError:
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        manifest["paths"] = [os.path.join(entry, name) for name in manifest["files"]]
+        return manifest
+
+    def new_tmp_dir(self, video_hash: str, method: str, params: dict) -> str:
+        """Private folder where an entry is written before `commit`."""
+        tmp_dir = f"{self.entry_dir(video_hash, method, params)}{_TMP_MARKER}{uuid.uuid4().hex[:8]}"
+        os.makedirs(tmp_dir)
+        return tmp_dir
+
+    def discard(self, tmp_dir: str):
+        """Remove an uncommitted temporary folder, and its video folder if no entry is left in it."""
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        video_dir = os.path.dirname(tmp_dir)
+        for folder in (video_dir, os.path.dirname(video_dir)):
+            try:
+                os.rmdir(folder)
+            except OSError:
+                break
+
+    def commit(self, tmp_dir: str, video_hash: str, method: str, params: dict, paths: list,
+               timestamps: Dict[str, float] = None) -> dict:
+        """
+        Write the manifest of a finished temporary folder and move it into place.
+        If another writer committed the same entry first, its entry is kept.
+        """
+        files = [os.path.basename(p) for p in paths]
+        manifest = {
+            "method": method,
+            "params": params,
+            "video_hash": video_hash,
+            "files": files,
+            "timestamps": {os.path.basename(p): round(ts, 3) for p, ts in (timestamps or {}).items()},
+            "size": sum(os.path.getsize(os.path.join(tmp_dir, f)) for f in os.listdir(tmp_dir)),
+            "created": time.time(),
+        }
+        with open(os.path.join(tmp_dir, MANIFEST), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        entry = self.entry_dir(video_hash, method, params)
+        try:
+            os.rename(tmp_dir, entry)
+        except OSError:
+            # Entry committed concurrently (or a leftover folder without manifest)
+            if self.get(video_hash, method, params) is None:
+                os.rename(tmp_dir, entry)
+            else:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                return self.get(video_hash, method, params)
+
+        self._stores += 1
+        if self.max_bytes and self._stores % self._EVICT_EVERY == 0:
+            self.evict_to_size()
+        manifest["paths"] = [os.path.join(entry, name) for name in files]
+        return manifest
+
+    def evict_to_size(self):
+        """Remove least recently used entries down to 90% of the budget, and stale temporary folders."""
+        entries = []
+        total = 0
+        now = time.time()
+        for prefix in os.scandir(self.root):
+            if not prefix.is_dir():
+                continue
+            for video in os.scandir(prefix.path):
+                if not video.is_dir():
+                    continue
+                for entry in os.scandir(video.path):
+                    if _TMP_MARKER in entry.name:
+                        # Writers that crashed more than a day ago
+                        if now - entry.stat().st_mtime > 86400:
+                            shutil.rmtree(entry.path, ignore_errors=True)
+                        continue
+                    manifest_path = os.path.join(entry.path, MANIFEST)
+                    try:
+                        with open(manifest_path, "r", encoding="utf-8") as f:
+                            size = json.load(f)["size"]
+                        used = os.stat(manifest_path).st_mtime
+                    except (OSError, ValueError, KeyError):
+                        continue
+                    entries.append((used, size, entry.path))
+                    total += size
+
+        if not self.max_bytes or total <= self.max_bytes:
+            return
+        to_free = total - int(self.max_bytes * 0.9)
+        freed = 0
+        evicted = 0
+        for _, size, path in sorted(entries):
+            shutil.rmtree(path, ignore_errors=True)
+            freed += size
+            evicted += 1
+            try:
+                os.rmdir(os.path.dirname(path))  # only once the video has no entry left
+            except OSError:
+                pass
+            if freed >= to_free:
+                break
+        print(f"🧹 Evicted {evicted} extraction cache entries ({freed / 1024 ** 2:.1f} MB)")
@@ -0,0 +1,146 @@
+import json
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, Tuple
+from frame_extractors.model_registry import get_detector
+from data_filling.pipeline.tools_pipeline.extract_framings import (
+    PEOPLE_METHODS, extract_all_framings, method_options, plan_methods
+)
+from data_filling.pipeline.tools_pipeline.extraction_cache import ExtractionCache
+
+
+def _init_worker(detector_weights: str, detector_warmup: bool):
+    # Each worker process loads (and optionally warms up) its own detector once
+    get_detector(detector_weights, warmup=detector_warmup)
+
+
+def _extract_in_worker(video_path: str, output_dir: str, detector_weights: str, regroup_max_width: int,
+                       methods: frozenset, cache: ExtractionCache, seek_min_gap_s: float, options: dict) -> tuple:
+    # Workers always extract eagerly (lazy extraction does not use the pool)
+    needs_detector = methods is None or methods & PEOPLE_METHODS
+    detector = get_detector(detector_weights) if needs_detector else None
+    return extract_all_framings(
+        video_path, output_dir, detector=detector, regroup_max_width=regroup_max_width,
+        methods=methods, detector_weights=detector_weights, cache=cache, seek_min_gap_s=seek_min_gap_s,
+        options=options
+    )
+
+
+def _planned_methods(conf: dict):
+    """Framings used by the configured template (None = all of them, when there is no template)."""
+    template_path = conf.get("template_path")
+    if not template_path:
+        return None
+    with open(template_path, "r", encoding="utf-8") as f:
+        methods = frozenset(plan_methods(json.load(f)))
+    print(f"🗂️ Framings used by the template: {', '.join(sorted(methods))}")
+    return methods
+
+
+def iter_extractions(jobs: Iterable[Tuple[object, str]], output_dir: str, conf: dict) -> Iterator[tuple]:
+    """
+    Run `extract_all_framings` for every (payload, video_path) job and yield
+    (payload, video_path, video_id, frame_paths_by_method) as soon as each video is done.
+
+    With `extraction_workers` > 1 in the config, videos are extracted in parallel processes
+    (results may come out of order). Jobs are pulled lazily by a feeder thread, at most 2 per worker
+    in flight, so each extraction is yielded as soon as it finishes even while the next job is awaited.
+
+    Only the framings used by the template are extracted. With `lazy_extraction`, extraction is
+    deferred until the model first reads the returned mapping.
+    Framings are stored in the content-addressed extraction cache (`extraction_cache_dir`,
+    bounded by `extraction_cache_max_gb`) and reused by any later run on the same video content.
+    """
+    workers = int(conf.get("extraction_workers", 1) or 1)
+    detector_weights = conf.get("detector_weights", "yolov8n.pt")
+    detector_warmup = conf.get("detector_warmup", False)
+    regroup_max_width = conf.get("regroup_max_width")
+    methods = _planned_methods(conf)
+    lazy = bool(conf.get("lazy_extraction", False))
+    if lazy and workers > 1:
+        # Lazy mappings are extracted by whoever reads them (the LLM threads): a pool would do no work
+        print(f"⚠️ lazy_extraction: extraction runs in the LLM workers, ignoring extraction_workers={workers}")
+        workers = 1
+    seek_min_gap_s = float(conf.get("seek_min_gap_s", 2.0))
+    options = method_options(conf)
+    cache = ExtractionCache(
+        conf.get("extraction_cache_dir") or os.path.join(output_dir, "extraction_cache"),
+        max_gb=float(conf.get("extraction_cache_max_gb", 20) or 0),
+    )
+    cache.evict_to_size()
+    # The detector is only loaded when a people framing is used
+    needs_detector = methods is None or bool(methods & PEOPLE_METHODS)
+
+    if workers <= 1:
+        detector = get_detector(detector_weights, warmup=detector_warmup) if needs_detector and not lazy else None
+        for payload, video_path in jobs:
+            # A broken video (no audio track, HTML error page, ...) only skips that video
+            try:
+                video_id, paths = extract_all_framings(
+                    video_path, output_dir, detector=detector, regroup_max_width=regroup_max_width,
+                    methods=methods, lazy=lazy, detector_weights=detector_weights, cache=cache,
+                    seek_min_gap_s=seek_min_gap_s, options=options
+                )
+            except Exception as e:
+                print(f"❌ Extraction failed for {video_path}: {e}")
+                continue
+            yield payload, video_path, video_id, paths
+        return
+
+    print(f"⚙️ Extracting with {workers} worker process(es)")
+    results = queue.Queue()
+    slots = threading.BoundedSemaphore(2 * workers)
+    stop = threading.Event()
+    # "spawn": forking a parent that already holds threads or a torch model is unsafe
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker if needs_detector else None,
+        initargs=(detector_weights, detector_warmup),
+    ) as pool:
+
+        def feed():
+            # Pulling a job may block (e.g. waiting for a download): done in this thread so that
+            # finished extractions are yielded meanwhile
+            submitted = 0
+            try:
+                for payload, video_path in jobs:
+                    while not slots.acquire(timeout=1.0):
+                        if stop.is_set():
+                            return
+                    if stop.is_set():
+                        return
+                    future = pool.submit(
+                        _extract_in_worker, video_path, output_dir, detector_weights, regroup_max_width, methods,
+                        cache, seek_min_gap_s, options
+                    )
+                    future.add_done_callback(lambda f, job=(payload, video_path): results.put((f, job)))
+                    submitted += 1
+            except Exception as e:
+                print(f"❌ Extraction jobs failed: {e}")
+            finally:
+                results.put((None, submitted))
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+        try:
+            total, received = None, 0
+            while total is None or received < total:
+                future, item = results.get()
+                if future is None:
+                    total = item
+                    continue
+                received += 1
+                slots.release()
+                payload, video_path = item
+                try:
+                    video_id, paths = future.result()
+                except Exception as e:
+                    print(f"❌ Extraction failed for {video_path}: {e}")
+                    continue
+                yield payload, video_path, video_id, paths
+        finally:
+            stop.set()
@@ -0,0 +1,69 @@
+import csv
+import threading
+import time
+from typing import List
+
+
+class ResultWriter:
+    """
+    Writes result rows as they complete, in the given column order, to a CSV file and
+    optionally to a Parquet file (requires pyarrow, one row group per flush).
+
+    Rows are buffered and flushed every `flush_rows` rows or `flush_seconds` seconds,
+    so partial results can be read while a run is in progress. Thread-safe.
+    """
+
+    def __init__(self, csv_path: str, columns: List[str], parquet_path: str = None,
+                 flush_rows: int = 50, flush_seconds: float = 30.0):
+        self.columns = columns
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_seconds = flush_seconds
+        self.rows_written = 0
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+        self._csv_file = open(csv_path, "w", newline="", encoding="utf-8")
+        self._csv = csv.DictWriter(self._csv_file, fieldnames=columns, extrasaction="ignore")
+        self._csv.writeheader()
+        self._csv_file.flush()
+
+        self._parquet = None
+        if parquet_path:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                print("⚠️ Parquet output requested but the 'pyarrow' package is missing, writing CSV only.")
+            else:
+                # Tag values are mixed (labels, numbers, lists): stored as strings, like in the CSV
+                self._schema = pa.schema([(column, pa.string()) for column in columns])
+                self._parquet = pq.ParquetWriter(parquet_path, self._schema)
+
+    def write(self, result: dict):
+        with self._lock:
+            self._pending.append(result)
+            if len(self._pending) >= self.flush_rows or time.monotonic() - self._last_flush >= self.flush_seconds:
+                self._flush()
+
+    def _flush(self):
+        if self._pending:
+            self._csv.writerows(self._pending)
+            self._csv_file.flush()
+            if self._parquet is not None:
+                import pyarrow as pa
+                table = pa.Table.from_pylist(
+                    [{c: None if row.get(c) is None else str(row[c]) for c in self.columns} for row in self._pending],
+                    schema=self._schema,
+                )
+                self._parquet.write_table(table)
+            self.rows_written += len(self._pending)
+            self._pending = []
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            self._flush()
+            self._csv_file.close()
+            if self._parquet is not None:
+                self._parquet.close()
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+
+def job_key(url: str, brand: str, version: str) -> str:
+    """Stable id of a CSV row: the same URL, brand and template version always give the same key."""
+    return hashlib.sha256(f"{url}\n{brand}\n{version}".encode("utf-8")).hexdigest()
+
+
+class RunJournal:
+    """
+    Append-only JSONL journal of the rows completed by the CSV pipeline, one
+    {"key", "result"} record per line, written and fsynced as soon as a row is done.
+
+    On open, a line truncated by a crash is dropped and the byte offset of every
+    completed key is indexed, so a restarted run skips them and results can be read
+    back one by one without loading the whole journal.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._offsets = {}  # keys completed in this run, or taken back from an earlier one
+        self._previous = {}  # keys completed by earlier runs, not taken yet
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._load()
+        self._file = open(path, "ab")
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r+b") as f:
+            offset = 0
+            for line in f:
+                if not line.endswith(b"\n"):
+                    # Partial record of an interrupted write: truncated, the row will be redone
+                    print(f"⚠️ Dropping truncated journal record at byte {offset} of {self.path}")
+                    f.truncate(offset)
+                    break
+                try:
+                    self._previous[json.loads(line)["key"]] = offset
+                except (ValueError, KeyError):
+                    print(f"⚠️ Skipping unreadable journal record at byte {offset} of {self.path}")
+                offset += len(line)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._offsets or key in self._previous
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._offsets) + len(self._previous)
+
+    def append(self, key: str, result: dict):
+        line = (json.dumps({"key": key, "result": result}, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            offset = self._file.tell()
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._previous.pop(key, None)
+            self._offsets[key] = offset
+
+    def take(self, key: str) -> Optional[dict]:
+        """
+        Result of a row completed by an earlier run, returned only once: later calls, and rows
+        completed in this run, return None (the journal itself dedupes repeated input rows).
+        """
+        with self._lock:
+            offset = self._previous.pop(key, None)
+            if offset is None:
+                return None
+            self._offsets[key] = offset
+        return self._read_at(offset)
+
+    def read(self, key: str) -> Optional[dict]:
+        """Result journaled for `key` (None if the row is not completed)."""
+        with self._lock:
+            offset = self._offsets.get(key, self._previous.get(key))
+        if offset is None:
+            return None
+        return self._read_at(offset)
+
+    def _read_at(self, offset: int) -> dict:
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())["result"]
+
+    def close(self):
+        with self._lock:
+            self._file.close()
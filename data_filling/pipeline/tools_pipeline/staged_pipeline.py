@@ -0,0 +1,90 @@
+import queue
+import threading
+from typing import Callable, Iterable
+from data_filling.pipeline.tools_pipeline.parallel_extraction import iter_extractions
+
+_DONE = object()
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blocking put that gives up once the pipeline is stopping."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=1.0)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def run_staged_pipeline(jobs: Iterable, download: Callable, handle: Callable, output_dir: str, conf: dict):
+    """
+    Run download -> extraction -> LLM stages concurrently, connected by bounded queues.
+
+    - `download(payload)` returns the local video path (or None to skip), run by `download_workers`
+      threads that prefetch at most `download_prefetch` videos ahead of extraction
+    - extraction runs `extract_all_framings` through `iter_extractions` (`extraction_workers` processes)
+    - `handle(payload, video_path, video_id, frame_paths_by_method)` runs on `llm_workers` threads
+
+    Full queues block the upstream stage, which bounds the number of videos on disk at any time
+    when tagged videos are deleted (`keep_downloaded_videos: false`).
+    """
+    download_workers = max(1, int(conf.get("download_workers", 2)))
+    prefetch = max(1, int(conf.get("download_prefetch", 4)))
+    llm_workers = max(1, int(conf.get("llm_workers", 1)))
+
+    downloaded = queue.Queue(maxsize=prefetch)
+    extracted = queue.Queue(maxsize=llm_workers)
+    stop = threading.Event()
+    jobs = iter(jobs)
+    jobs_lock = threading.Lock()
+
+    def download_stage():
+        while not stop.is_set():
+            with jobs_lock:
+                payload = next(jobs, _DONE)
+            if payload is _DONE:
+                return
+            try:
+                video_path = download(payload)
+            except Exception as e:
+                print(f"❌ Download stage failed: {e}")
+                continue
+            if video_path and not _put(downloaded, (payload, video_path), stop):
+                return
+
+    def downloaded_jobs():
+        while (item := downloaded.get()) is not _DONE:
+            yield item
+
+    def extract_stage():
+        try:
+            for result in iter_extractions(downloaded_jobs(), output_dir, conf):
+                if not _put(extracted, result, stop):
+                    return
+        except Exception as e:
+            print(f"❌ Extraction stage failed: {e}")
+            stop.set()
+        finally:
+            for _ in range(llm_workers):
+                extracted.put(_DONE)
+
+    def llm_stage():
+        while (item := extracted.get()) is not _DONE:
+            try:
+                handle(*item)
+            except Exception as e:
+                print(f"❌ Prediction failed for {item[1]}: {e}")
+
+    downloaders = [threading.Thread(target=download_stage, daemon=True) for _ in range(download_workers)]
+    extractor = threading.Thread(target=extract_stage, daemon=True)
+    predictors = [threading.Thread(target=llm_stage, daemon=True) for _ in range(llm_workers)]
+    for thread in downloaders + [extractor] + predictors:
+        thread.start()
+
+    for thread in downloaders:
+        thread.join()
+    _put(downloaded, _DONE, stop)
+    extractor.join()
+    for thread in predictors:
+        thread.join()
@@ -2,6 +2,7 @@ import os
 import re
 import glob
 import json
+import hashlib
 
 def ensure_dir(path: str):
     if not os.path.exists(path):
@@ -24,4 +25,37 @@ def find_brand_knowledge_path(brand_key: str, knowledge_dir: str) -> str | None:
                     return json_path
         except Exception as e:
             print(f"⚠️ Error reading brand file '{json_path}': {e}")
-    return None
\ No newline at end of file
+    return None
+
+def resolve_brand_knowledge(brand_name: str, knowledge_dir: str, agent) -> str | None:
+    """
+    Return the brand knowledge file for a brand, generating it with the agent if missing.
+    """
+    brand_knowledge_path = find_brand_knowledge_path(brand_name, knowledge_dir)
+    if brand_knowledge_path:
+        return brand_knowledge_path
+
+    print(f"⚠️ No knowledge file for '{brand_name}', generating one...")
+    brand_info = agent.generate_knowledge(brand_name)
+    if not brand_info:
+        return None
+    filename = normalize_filename(brand_name) + ".json"
+    save_path = os.path.join(knowledge_dir, filename)
+    with open(save_path, "w", encoding="utf-8") as f:
+        json.dump(brand_info, f, indent=2, ensure_ascii=False)
+    return save_path
+
+
+def template_version(template: dict) -> str:
+    """Short hash of a template: results produced with another version of the template are not reused."""
+    content = json.dumps(template, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()[:12]
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """sha256 of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
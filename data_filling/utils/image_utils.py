@@ -0,0 +1,52 @@
+import re
+from typing import List, Optional, Tuple
+import cv2
+import numpy as np
+
+
+def parse_grid_packing(packing: Optional[str]) -> Optional[Tuple[int, int]]:
+    """
+    Parse a template `packing` value such as "grid_3x3" (rows x columns).
+    Return (rows, cols), or None when frames are sent one per image.
+    """
+    if not packing:
+        return None
+    match = re.fullmatch(r"grid_(\d+)x(\d+)", packing.strip())
+    if not match or int(match.group(1)) < 1 or int(match.group(2)) < 1:
+        raise ValueError(f"Unsupported packing value: {packing}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def _draw_label(tile, label: str):
+    scale = max(0.4, tile.shape[1] / 640)
+    thickness = max(1, round(scale * 2))
+    (w, h), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness)
+    cv2.rectangle(tile, (0, 0), (w + 8, h + baseline + 8), (0, 0, 0), -1)
+    cv2.putText(tile, label, (4, h + 4), cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), thickness, cv2.LINE_AA)
+
+
+def tile_images(images: List[np.ndarray], rows: int, cols: int, tile_width: int = 512,
+                labels: List[str] = None) -> np.ndarray:
+    """
+    Tile up to rows x cols BGR images row by row into one grid image.
+    Every tile is resized to `tile_width` with the aspect ratio of the first image,
+    empty cells are left black and optional labels (e.g. timestamps) are drawn top-left.
+    """
+    if not images:
+        raise ValueError("No images to tile.")
+    if len(images) > rows * cols:
+        raise ValueError(f"{len(images)} images do not fit in a {rows}x{cols} grid.")
+
+    height, width = images[0].shape[:2]
+    tile_height = max(1, round(tile_width * height / width))
+    grid = np.zeros((rows * tile_height, cols * tile_width, 3), dtype=np.uint8)
+
+    for i, image in enumerate(images):
+        interpolation = cv2.INTER_AREA if image.shape[1] > tile_width else cv2.INTER_LINEAR
+        tile = cv2.resize(image, (tile_width, tile_height), interpolation=interpolation)
+        if labels and i < len(labels) and labels[i]:
+            _draw_label(tile, labels[i])
+        row, col = divmod(i, cols)
+        grid[row * tile_height:(row + 1) * tile_height, col * tile_width:(col + 1) * tile_width] = tile
+
+    return grid
@@ -1,3 +1,95 @@
+import asyncio
+import threading
+import weakref
+import httpx
+from openai import OpenAI, AsyncOpenAI
+
+# Clients are shared per process (and per event loop for async ones) so that every model,
+# transcription and brand agent call reuses the same connection pool.
+# Retries are left to the rate limiter (see rate_limiter.py), which coordinates them across calls.
+_SYNC_CLIENTS = {}
+_ASYNC_CLIENTS = weakref.WeakKeyDictionary()
+_LOCK = threading.Lock()
+
+
+def _client_settings(config: dict) -> tuple:
+    api_key = config.get("openai_api_key")
+    if not api_key:
+        raise ValueError("Missing 'openai_api_key' in config.")
+    return (
+        api_key,
+        config.get("verify_ssl", True),
+        int(config.get("http_max_connections", 100)),
+        int(config.get("http_max_keepalive_connections", 20)),
+        float(config.get("http_keepalive_expiry", 30.0)),
+        float(config.get("http_timeout", 600.0)),
+        bool(config.get("http2", False)),
+    )
+
+
+def _http_client_kwargs(settings: tuple) -> dict:
+    _, verify_ssl, max_connections, max_keepalive, keepalive_expiry, timeout, http2 = settings
+    if not verify_ssl:
+        print("⚠️ SSL verification disabled (dev mode).")
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("⚠️ HTTP/2 requested but the 'h2' package is missing, using HTTP/1.1.")
+            http2 = False
+    return dict(
+        verify=verify_ssl,
+        http2=http2,
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        ),
+    )
+
+
+def get_openai_client(config: dict) -> OpenAI:
+    """
+    Return the process-wide OpenAI client for this config.
+    Pool limits, keep-alive and HTTP/2 come from the `http_*` / `http2` config keys.
+    """
+    settings = _client_settings(config)
+    with _LOCK:
+        client = _SYNC_CLIENTS.get(settings)
+        if client is None:
+            http_client = httpx.Client(**_http_client_kwargs(settings))
+            client = OpenAI(api_key=settings[0], http_client=http_client, max_retries=0)
+            _SYNC_CLIENTS[settings] = client
+    return client
+
+
+def get_async_openai_client(config: dict) -> AsyncOpenAI:
+    """
+    Return the AsyncOpenAI client for this config, shared within the running event loop
+    (async connections cannot be reused across event loops).
+    """
+    settings = _client_settings(config)
+    loop = asyncio.get_running_loop()
+    with _LOCK:
+        clients = _ASYNC_CLIENTS.setdefault(loop, {})
+        client = clients.get(settings)
+        if client is None:
+            http_client = httpx.AsyncClient(**_http_client_kwargs(settings))
+            client = AsyncOpenAI(api_key=settings[0], http_client=http_client, max_retries=0)
+            clients[settings] = client
+    return client
+
+
+async def close_async_openai_clients():
+    """Close the AsyncOpenAI clients of the running event loop and their connections."""
+    loop = asyncio.get_running_loop()
+    with _LOCK:
+        clients = _ASYNC_CLIENTS.pop(loop, {})
+    for client in clients.values():
+        await client.close()
+
+
 def query_llm_with_images(images: list, prompt_json: dict) -> str:
     """
     Envoie les images + JSON de questions à GPT vision (mock pour l’instant)
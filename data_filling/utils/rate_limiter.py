@@ -0,0 +1,165 @@
+import asyncio
+import contextlib
+import random
+import threading
+import time
+from typing import Callable, Optional
+import openai
+
+# One limiter per (model, limits) per process, shared by every thread and event loop
+_LIMITERS = {}
+_LOCK = threading.Lock()
+
+
+class TokenBucket:
+    """
+    Per-minute budget refilled continuously. Callers reserve their cost up front (the level may
+    go negative) and wait for the returned delay, so concurrent callers are served in arrival order.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+        # A single call larger than the whole budget only has to wait for a full bucket
+        amount = min(amount, self.capacity)
+        delay = max(0.0, (amount - self.level) / self.rate)
+        self.level -= amount
+        return delay
+
+
+class RateLimiter:
+    """
+    Keep OpenAI calls under the configured requests/tokens per minute and retry
+    rate-limited or transient failures with jittered exponential backoff.
+    A 429 pauses every caller of the limiter until its `Retry-After` has passed.
+    """
+
+    def __init__(self, rpm: int = 0, tpm: int = 0, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        :param rpm: Requests per minute (0 = unlimited)
+        :param tpm: Estimated tokens per minute (0 = unlimited)
+        :param max_retries: Retries after a 429, 5xx, timeout or connection error
+        :param base_delay: First backoff delay in seconds, doubled on every retry
+        :param max_delay: Upper bound of a backoff delay in seconds
+        """
+        self.requests = TokenBucket(rpm) if rpm and rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm and tpm > 0 else None
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Reserve one request and `tokens` tokens, return how long the caller must wait."""
+        with self._lock:
+            now = time.monotonic()
+            delay = max(0.0, self._paused_until - now)
+            if self.requests:
+                delay = max(delay, self.requests.reserve(1, now))
+            if self.tokens and tokens:
+                delay = max(delay, self.tokens.reserve(tokens, now))
+            return delay
+
+    def _pause(self, seconds: float):
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        try:
+            if "retry-after-ms" in headers:
+                return float(headers["retry-after-ms"]) / 1000.0
+            if "retry-after" in headers:
+                return float(headers["retry-after"])
+        except (TypeError, ValueError):
+            pass
+        return None
+
+    def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+        """Return the delay before retrying `error`, or None if it should not be retried."""
+        if attempt >= self.max_retries:
+            return None
+        retryable = isinstance(error, (openai.RateLimitError, openai.APIConnectionError)) or (
+            isinstance(error, openai.APIStatusError) and error.status_code >= 500
+        )
+        if not retryable:
+            return None
+
+        backoff = min(self.max_delay, self.base_delay * 2 ** attempt)
+        retry_after = self._retry_after(error)
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, self.base_delay)
+        else:
+            delay = random.uniform(backoff / 2, backoff)
+        if isinstance(error, openai.RateLimitError):
+            self._pause(delay)
+        print(f"⏳ {type(error).__name__}, retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+        return delay
+
+    def call(self, fn: Callable, tokens: int = 0, slot=None):
+        """
+        Run `fn()` once the budget allows it, retrying rate-limited and transient failures.
+        :param slot: Semaphore (or lock) held only while `fn()` runs, released during every wait
+        """
+        slot = slot if slot is not None else contextlib.nullcontext()
+        attempt = 0
+        while True:
+            delay = self._reserve(tokens)
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                with slot:
+                    return fn()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, fn: Callable, tokens: int = 0, slot: asyncio.Semaphore = None):
+        """Async version of `call`: `fn()` returns the awaitable to run."""
+        slot = slot if slot is not None else contextlib.nullcontext()
+        attempt = 0
+        while True:
+            delay = self._reserve(tokens)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                async with slot:
+                    return await fn()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
+
+
+def get_rate_limiter(config: dict, model: str) -> RateLimiter:
+    """
+    Return the process-wide limiter for `model`, built from the `openai_rpm`, `openai_tpm`
+    and `openai_max_retries` config keys (OpenAI limits are per model).
+    """
+    settings = (
+        model,
+        int(config.get("openai_rpm", 0) or 0),
+        int(config.get("openai_tpm", 0) or 0),
+        int(config.get("openai_max_retries", 5)),
+    )
+    with _LOCK:
+        limiter = _LIMITERS.get(settings)
+        if limiter is None:
+            limiter = RateLimiter(rpm=settings[1], tpm=settings[2], max_retries=settings[3])
+            _LIMITERS[settings] = limiter
+    return limiter
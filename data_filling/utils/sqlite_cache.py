@@ -0,0 +1,102 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class SQLiteCache:
+    """
+    Persistent key -> JSON value store in one table of a SQLite file, shared by threads.
+    Entries older than `max_age_days` are ignored and purged; once the table holds more than
+    `max_mb` of values, the least recently used entries are evicted.
+    Several caches (one per table) can live in the same file.
+    """
+
+    _EVICT_EVERY = 100  # puts between two size checks
+
+    def __init__(self, path: str, table: str, max_mb: float = 512, max_age_days: float = 30):
+        """
+        :param path: SQLite file (created if missing)
+        :param table: Table holding this cache's entries
+        :param max_mb: Size budget of the stored values in MB (0 = unbounded)
+        :param max_age_days: Entries older than this are expired (0 = never)
+        """
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name: {table}")
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.table = table
+        self.max_bytes = int(max_mb * 1024 * 1024) if max_mb else 0
+        self.max_age_s = max_age_days * 86400 if max_age_days else 0
+        self.hits = 0
+        self.misses = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed)")
+        self.purge_expired()
+
+    def get(self, key: str):
+        """Return the cached value for `key`, or None (counted as a miss)."""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.max_age_s and now - row[1] > self.max_age_s:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, value):
+        """Store a JSON-serializable value under `key`."""
+        data = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data.encode("utf-8")), now, now)
+            )
+            self._puts += 1
+            if self.max_bytes and self._puts % self._EVICT_EVERY == 0:
+                self._evict_to_size()
+
+    def _evict_to_size(self):
+        total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used entries down to 90% of the budget
+        to_free = total - int(self.max_bytes * 0.9)
+        freed = 0
+        stale = []
+        for key, size in self._conn.execute(f"SELECT key, size FROM {self.table} ORDER BY accessed"):
+            stale.append((key,))
+            freed += size
+            if freed >= to_free:
+                break
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", stale)
+        print(f"🧹 Evicted {len(stale)} entries from cache '{self.table}'")
+
+    def purge_expired(self):
+        if not self.max_age_s:
+            return
+        with self._lock, self._conn:
+            self._conn.execute(f"DELETE FROM {self.table} WHERE created < ?", (time.time() - self.max_age_s,))
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = 100 * self.hits / total if total else 0
+        return f"{self.hits} hit(s), {self.misses} miss(es) ({rate:.0f}% hit rate)"
@@ -1,10 +1,58 @@
+import os
 from abc import ABC, abstractmethod
 
+
 class FrameExtractor(ABC):
+    """
+    Frame extractors consume a decoded video through a streaming protocol:
+    `start` once with the stream properties, `on_frame` for every decoded frame,
+    then `finalize` to write the selected frames and return their paths.
+    This lets a single `VideoFrameSource` decode the file once for all extractors.
+    Extractors record the timestamp of each saved frame in `timestamps` ({path: seconds}).
+    """
+
+    def start(self, output_dir: str, fps: float, total_frames: int):
+        """
+        Prepare the extractor for a new video.
+        :param output_dir: folder where the selected frames are saved (None if nothing is saved)
+        :param fps: frame rate reported by the container
+        :param total_frames: frame count reported by the container (may be unreliable)
+        """
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.output_dir = output_dir
+        self.fps = fps
+        self.total_frames = total_frames
+        self.timestamps = {}
+
+    def wants_frame(self, index: int) -> bool:
+        """
+        Tell the frame source whether frame `index` is needed.
+        Interval extractors override this so unused frames are skipped without being decoded.
+        """
+        return True
+
+    @abstractmethod
+    def on_frame(self, frame, index: int, timestamp: float):
+        """
+        Receive one decoded BGR frame with its index and timestamp (in seconds).
+        The frame is shared between extractors and must not be modified in place.
+        """
+        pass
+
     @abstractmethod
+    def finalize(self) -> list:
+        """
+        Called once the stream is exhausted.
+        Return list of saved frame paths.
+        """
+        pass
+
     def extract(self, video_path: str, output_dir: str) -> list:
         """
         Extract frames from a video and save them in output_dir.
         Return list of saved frame paths.
         """
-        pass
+        from frame_extractors.frame_source import VideoFrameSource
+
+        return VideoFrameSource(video_path).run({"frames": (self, output_dir)})["frames"]
@@ -1,63 +1,56 @@
 import os
 import cv2
-from ultralytics import YOLO
 from frame_extractors.base_extractor import FrameExtractor
+from frame_extractors.person_detections import PersonDetectionStage
 
 
 class PeopleExtractor(FrameExtractor):
-    def __init__(self, interval_s=1.0, return_person_score=False):
-        self.model = YOLO("yolov8n.pt")
+    def __init__(self, interval_s=1.0, return_person_score=False, batch_size=16, model=None,
+                 weights="yolov8n.pt", detections=None):
+        """
+        :param interval_s: Frame sampling interval in seconds (rounded to a multiple of the detection grid, 0.5s)
+        :param return_person_score: Return (path, person_area_ratio) tuples instead of paths
+        :param batch_size: Number of sampled frames sent to YOLO per call
+        :param model: Preloaded detector (defaults to the shared one for `weights`, loaded on first use)
+        :param weights: YOLO weights file used when no model is given
+        :param detections: Shared PersonDetectionStage fed by the frame source; when given, detection
+                           runs once in the stage and this extractor only keeps its own sampled frames
+        """
         self.interval_s = interval_s
         self.return_person_score = return_person_score  # <--- AJOUT
-
-    def detect_people_in_image(self, image_path):
-        results = self.model(image_path)
-        boxes = results[0].boxes
-        person_boxes = [box for box in boxes if int(box.cls[0]) == 0]
-        if not person_boxes:
-            return False, [], 0.0
-
-        image = cv2.imread(image_path)
-        img_area = image.shape[0] * image.shape[1]
-
-        total_person_area = 0
-        bboxes = []
-
-        for box in person_boxes:
-            x1, y1, x2, y2 = map(int, box.xyxy[0])
-            w, h = x2 - x1, y2 - y1
-            area = w * h
-            total_person_area += area
-            bboxes.append((x1, y1, x2, y2))
-
-        person_area_ratio = total_person_area / img_area
-        return True, bboxes, person_area_ratio
-
-    def extract(self, video_path, output_dir):
-        os.makedirs(output_dir, exist_ok=True)
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_interval = int(fps * self.interval_s)
-        saved_frames = []
-        count = 0
-        frame_idx = 0
-
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            if count % frame_interval == 0:
-                temp_path = os.path.join(output_dir, f"_tmp_frame.jpg")
-                cv2.imwrite(temp_path, frame)
-                has_person, _, person_area_ratio = self.detect_people_in_image(temp_path)
-                if has_person:
-                    final_path = os.path.join(output_dir, f"frame_{frame_idx:04d}.jpg")
-                    os.rename(temp_path, final_path)
-                    saved_frames.append((final_path, person_area_ratio) if self.return_person_score else final_path)
-                    frame_idx += 1
-                else:
-                    os.remove(temp_path)
-            count += 1
-        cap.release()
-        return saved_frames
+        self._owns_detections = detections is None
+        self.detections = detections or PersonDetectionStage(model=model, weights=weights, batch_size=batch_size)
+        self.detections.subscribe(self)
+
+    def detect_people_in_image(self, image):
+        """Detect people in a single image (BGR array or image path)."""
+        if isinstance(image, str):
+            image = cv2.imread(image)
+        return self.detections.detect_people([image])[0]
+
+    def start(self, output_dir, fps, total_frames):
+        super().start(output_dir, fps, total_frames)
+        self.saved_frames = []
+        if self._owns_detections:
+            self.detections.start(None, fps, total_frames)
+
+    def wants_frame(self, index):
+        # Frames are sampled by the detection stage, on its grid
+        return self._owns_detections and self.detections.wants_frame(index)
+
+    def on_frame(self, frame, index, timestamp):
+        if self._owns_detections:
+            self.detections.on_frame(frame, index, timestamp)
+
+    def on_detection(self, detection, frame):
+        if not detection.has_person:
+            return
+        final_path = os.path.join(self.output_dir, f"frame_{len(self.saved_frames):04d}.jpg")
+        cv2.imwrite(final_path, frame)
+        self.timestamps[final_path] = detection.timestamp
+        self.saved_frames.append((final_path, detection.area_ratio) if self.return_person_score else final_path)
+
+    def finalize(self):
+        # Detections of a shared stage may still be pending
+        self.detections.flush()
+        return self.saved_frames
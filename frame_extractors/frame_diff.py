@@ -0,0 +1,59 @@
+import cv2
+import numpy as np
+
+
+class FrameDiffer:
+    """
+    Sum of absolute grayscale differences between consecutive frames.
+    Each frame is converted to grayscale once (optionally downscaled to `diff_width` pixels wide)
+    into preallocated buffers, so no per-frame array is allocated once the first frame is seen.
+    """
+
+    def __init__(self, diff_width: int = None):
+        """
+        :param diff_width: width of the thumbnail used for the diff (None = full resolution)
+        """
+        self.diff_width = diff_width
+        self.reset()
+
+    def reset(self):
+        self._shape = None
+        self._has_prev = False
+
+    def _allocate(self, frame):
+        h, w = frame.shape[:2]
+        if self.diff_width and self.diff_width < w:
+            self._size = (self.diff_width, max(1, round(h * self.diff_width / w)))
+            self._gray = np.empty((h, w), dtype=np.uint8)
+        else:
+            self._size = None
+            self._gray = None
+        out_h, out_w = (self._size[1], self._size[0]) if self._size else (h, w)
+        self._prev = np.empty((out_h, out_w), dtype=np.uint8)
+        self._cur = np.empty((out_h, out_w), dtype=np.uint8)
+        self._diff = np.empty((out_h, out_w), dtype=np.uint8)
+        self._shape = frame.shape
+        self._has_prev = False
+
+    def push(self, frame):
+        """
+        Add the next frame of the stream.
+        :return: difference with the previous frame, or None for the first frame
+        """
+        if frame.shape != self._shape:
+            self._allocate(frame)
+
+        if self._size:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._gray)
+            cv2.resize(self._gray, self._size, dst=self._cur, interpolation=cv2.INTER_AREA)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY, dst=self._cur)
+
+        diff_val = None
+        if self._has_prev:
+            cv2.absdiff(self._prev, self._cur, dst=self._diff)
+            diff_val = cv2.sumElems(self._diff)[0]
+
+        self._prev, self._cur = self._cur, self._prev
+        self._has_prev = True
+        return diff_val
@@ -0,0 +1,136 @@
+import cv2
+from typing import Dict, Tuple
+
+
+class VideoFrameSource:
+    """
+    Decodes a video once and feeds every frame, with its index and timestamp,
+    to all registered frame extractors (see FrameExtractor streaming protocol).
+
+    Only frames wanted by at least one extractor are converted to BGR:
+    - "linear": every frame is grabbed, wanted ones are retrieved
+    - "seek": large gaps between wanted frames are skipped by seeking, small ones by grabbing.
+      Seeking only pays off for sparse samplers: with the default 2s threshold, a video also
+      sampled every 0.5s or 1s is scanned linearly
+    Seeking falls back to the linear scan when the container reports a bad FPS or frame count,
+    or when a seek does not land on the requested frame (checked on the decoded frame's timestamp).
+    """
+
+    def __init__(self, video_path: str, sampling: str = "seek", seek_min_gap_s: float = 2.0):
+        """
+        :param video_path: path of the video to decode
+        :param sampling: "seek" or "linear"
+        :param seek_min_gap_s: minimum gap (in seconds) between wanted frames to seek instead of grabbing
+        """
+        if sampling not in ("seek", "linear"):
+            raise ValueError(f"Unsupported sampling mode: {sampling}")
+        self.video_path = video_path
+        self.sampling = sampling
+        self.seek_min_gap_s = seek_min_gap_s
+
+    def run(self, extractors: Dict[str, Tuple]) -> Dict[str, list]:
+        """
+        :param extractors: {name: (extractor, output_dir)}
+        :return: {name: list of saved frame paths}
+        """
+        cap = cv2.VideoCapture(self.video_path)
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+        # Extractors are started even for an unreadable video, so their state (e.g. timestamps) exists
+        for extractor, output_dir in extractors.values():
+            extractor.start(output_dir, fps, total_frames)
+        if not cap.isOpened():
+            print(f"Error: Cannot open video '{self.video_path}'.")
+            return {name: [] for name in extractors}
+        consumers = [extractor for extractor, _ in extractors.values()]
+
+        index = 0
+        if self.sampling == "seek" and fps > 0 and total_frames > 0:
+            cap, index = self._seek_scan(cap, consumers, fps, total_frames)
+        if index is not None:
+            # Linear scan: also picks up frames beyond an underestimated frame count
+            self._linear_scan(cap, consumers, fps, index)
+
+        cap.release()
+
+        return {name: extractor.finalize() for name, (extractor, _) in extractors.items()}
+
+    @staticmethod
+    def _dispatch(cap, consumers, frame, index, fps):
+        timestamp = index / fps if fps > 0 else cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        for extractor in consumers:
+            extractor.on_frame(frame, index, timestamp)
+
+    def _linear_scan(self, cap, consumers, fps, index):
+        while cap.grab():
+            if any(extractor.wants_frame(index) for extractor in consumers):
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                self._dispatch(cap, consumers, frame, index, fps)
+            index += 1
+
+    def _seek_scan(self, cap, consumers, fps, total_frames):
+        """
+        Visit wanted frames up to the reported frame count.
+        Return the capture and the index where the linear scan must resume (None if the stream ended).
+        """
+        seek_min_gap = max(1, int(fps * self.seek_min_gap_s))
+        index = 0
+
+        while index < total_frames:
+            target = next(
+                (i for i in range(index, total_frames)
+                 if any(extractor.wants_frame(i) for extractor in consumers)),
+                total_frames
+            )
+            if target < total_frames and target - index >= seek_min_gap:
+                if self._seek(cap, target, fps):
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        return cap, None
+                    self._dispatch(cap, consumers, frame, target, fps)
+                    index = target + 1
+                    continue
+                print(f"⚠️ Inaccurate seek in '{self.video_path}', falling back to linear scan.")
+                # Reopen the video and grab back to `index`, without relying on seeking
+                cap.release()
+                cap = cv2.VideoCapture(self.video_path)
+                return self._advance(cap, 0, index)
+
+            cap, index = self._advance(cap, index, target)
+            if index is None or target == total_frames:
+                return cap, index
+
+            ret, frame = cap.read()
+            if not ret:
+                return cap, None
+            self._dispatch(cap, consumers, frame, target, fps)
+            index = target + 1
+
+        return cap, index
+
+    @staticmethod
+    def _seek(cap, target, fps) -> bool:
+        """
+        Seek to frame `target` and grab it. Return False if the grabbed frame is not the target.
+        OpenCV echoes the requested CAP_PROP_POS_FRAMES back, so the check uses the timestamp of the
+        decoded frame (keyframe-based seeking may land on another frame).
+        """
+        cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+        if not cap.grab():
+            return False
+        return abs(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0 - target / fps) < 0.5 / fps
+
+    @staticmethod
+    def _advance(cap, index, target):
+        """
+        Move the capture from `index` to `target` by grabbing, without decoding to BGR.
+        Return the capture and its new position (None if the stream ended).
+        """
+        while index < target:
+            if not cap.grab():
+                return cap, None
+            index += 1
+        return cap, index
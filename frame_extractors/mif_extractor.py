@@ -1,9 +1,13 @@
 import os
 import cv2
 import numpy as np
+import heapq
 import statistics
+import tempfile
 from typing import List
 from frame_extractors.base_extractor import FrameExtractor
+from frame_extractors.frame_diff import FrameDiffer
+from frame_extractors.frame_source import VideoFrameSource
 
 
 def is_uniform(frame, threshold_std: float = 5.0) -> bool:
@@ -11,102 +15,165 @@ def is_uniform(frame, threshold_std: float = 5.0) -> bool:
     return np.std(gray) < threshold_std
 
 
-import os
-import cv2
-import numpy as np
-import statistics
-from typing import List
-from frame_extractors.base_extractor import FrameExtractor
+def select_mif_indices(diffs: List[tuple], n_frames: int, k: float, min_frames: int,
+                       nb_frames_target: int) -> List[int]:
+    """
+    Select the maximum information frames from the frame differences.
+    :param diffs: list of (diff_value, frame_index) for frames 1..n_frames-1
+    :param n_frames: number of decoded frames
+    :return: sorted list of selected frame indices
+    """
+    diff_values = [float(d[0]) for d in diffs]
+    threshold = statistics.mean(diff_values) + k * statistics.pstdev(diff_values)
+    selected = [idx for (val, idx) in diffs if val >= threshold]
+
+    if 0 not in selected:
+        selected.insert(0, 0)
+    if n_frames - 1 not in selected:
+        selected.append(n_frames - 1)
+
+    selected = sorted(set(selected))
+
+    if len(selected) < min_frames:
+        top_diffs = sorted(diffs, key=lambda x: x[0], reverse=True)
+        needed = min_frames - len(selected)
+        for val, idx in top_diffs:
+            if idx not in selected:
+                selected.append(idx)
+                needed -= 1
+                if needed == 0:
+                    break
+        selected = sorted(set(selected))
 
+    if len(selected) > nb_frames_target:
+        diff_dict = {idx: val for (val, idx) in diffs if idx in selected}
+        sorted_by_diff = sorted(selected, key=lambda x: diff_dict.get(x, 0), reverse=True)
+        selected = sorted(set(sorted_by_diff[:nb_frames_target]))
 
-def is_uniform(frame, threshold_std: float = 5.0) -> bool:
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    return np.std(gray) < threshold_std
+    return selected
 
 
 class MIFExtractor(FrameExtractor):
-    def __init__(self, max_frames: int = 10, k: float = 4.0):
+    def __init__(self, max_frames: int = 10, k: float = 4.0, diff_width: int = None):
         """
         :param max_frames: maximum number of frames to extract
         :param k: multiplier for selecting frames with high difference
+        :param diff_width: compute frame differences on thumbnails of this width (None = full resolution)
         """
         self.max_frames = max_frames
         self.k = k
-
-    def extract(self, video_path: str, output_dir: str) -> List[str]:
-        os.makedirs(output_dir, exist_ok=True)
-
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            print(f"Error: Cannot open video '{video_path}'.")
+        self.diff_width = diff_width
+        self.differ = FrameDiffer(diff_width)
+
+    def start(self, output_dir, fps, total_frames):
+        super().start(output_dir, fps, total_frames)
+        duration_sec = total_frames / fps if fps > 0 else 0
+
+        self.nb_frames_target = min(self.max_frames, max(1, int(duration_sec)))
+        self.min_frames = min(3, self.nb_frames_target)
+        self.n_frames = 0
+        self.differ.reset()
+        self.diffs = []
+        self.selected_indices = []
+        # Bounded memory: only the first frame, the previous (eventually last) frame and the
+        # top-`max_frames` frames by difference are kept. Any frame selected by
+        # `select_mif_indices` other than the first/last is ranked within the top
+        # `nb_frames_target` (<= max_frames) differences, so selection is unchanged.
+        self._first_frame = None
+        self._prev_frame = None
+        self._candidates = []  # min-heap of (diff_value, -index, index, frame)
+
+    def on_frame(self, frame, index, timestamp):
+        idx = self.n_frames
+        self.n_frames += 1
+        diff_val = self.differ.push(frame)
+        if self._prev_frame is None:
+            self._first_frame = self._prev_frame = frame
+            return
+
+        self.diffs.append((diff_val, idx))
+        self._prev_frame = frame
+
+        candidate = (diff_val, -idx, idx, frame)
+        if len(self._candidates) < self.max_frames:
+            heapq.heappush(self._candidates, candidate)
+        elif candidate[:2] > self._candidates[0][:2]:
+            heapq.heapreplace(self._candidates, candidate)
+
+    def finalize(self) -> List[str]:
+        diffs, n_frames = self.diffs, self.n_frames
+        frames = {idx: frame for (_, _, idx, frame) in self._candidates}
+        if n_frames:
+            frames[0] = self._first_frame
+            frames[n_frames - 1] = self._prev_frame
+        self.diffs, self._candidates = [], []
+        self._first_frame = self._prev_frame = None
+
+        if not n_frames:
+            print("Error: Empty or corrupted video.")
             return []
 
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        duration_sec = total_frames / fps
-
-        nb_frames_target = min(self.max_frames, max(1, int(duration_sec)))
-        min_frames = min(3, nb_frames_target)
-
-        ret, prev_frame = cap.read()
-        if not ret:
-            print(f"Error: Empty or corrupted video '{video_path}'.")
-            return []
-
-        frames = [prev_frame]
-        diffs = []
-
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            frames.append(frame)
-
-            prev_gray = cv2.cvtColor(frames[-2], cv2.COLOR_BGR2GRAY)
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            diff_val = np.sum(cv2.absdiff(prev_gray, gray))
-            diffs.append((diff_val, len(frames) - 1))
-
-        cap.release()
-
         if not diffs:
             return []
 
-        diff_values = [float(d[0]) for d in diffs]
-        threshold = statistics.mean(diff_values) + self.k * statistics.pstdev(diff_values)
-        selected = [idx for (val, idx) in diffs if val >= threshold]
-
-        if 0 not in selected:
-            selected.insert(0, 0)
-        if len(frames) - 1 not in selected:
-            selected.append(len(frames) - 1)
-
-        selected = sorted(set(selected))
-
-        if len(selected) < min_frames:
-            top_diffs = sorted(diffs, key=lambda x: x[0], reverse=True)
-            needed = min_frames - len(selected)
-            for val, idx in top_diffs:
-                if idx not in selected:
-                    selected.append(idx)
-                    needed -= 1
-                    if needed == 0:
-                        break
-            selected = sorted(set(selected))
-
-        if len(selected) > nb_frames_target:
-            diff_dict = {idx: val for (val, idx) in diffs if idx in selected}
-            sorted_by_diff = sorted(selected, key=lambda x: diff_dict.get(x, 0), reverse=True)
-            selected = sorted(set(sorted_by_diff[:nb_frames_target]))
+        selected = select_mif_indices(diffs, n_frames, self.k, self.min_frames, self.nb_frames_target)
+        self.selected_indices = selected
 
         saved_paths = []
         for i, idx in enumerate(selected):
             frame = frames[idx]
             if is_uniform(frame):
                 continue
-            frame_path = os.path.join(output_dir, f"frame_{i:04d}.jpg")
+            frame_path = os.path.join(self.output_dir, f"frame_{i:04d}.jpg")
             cv2.imwrite(frame_path, frame)
             saved_paths.append(frame_path)
+            self.timestamps[frame_path] = idx / self.fps if self.fps > 0 else 0.0
 
         return saved_paths
 
+
+def compare_mif_diff_modes(video_paths: List[str], diff_width: int = 160, max_frames: int = 10,
+                           k: float = 4.0) -> dict:
+    """
+    Check whether the downscaled diff selects the same MIF frames as the full-resolution diff.
+    Both variants run on the same decoding pass of each video.
+    :return: {video_path: {"full": [...], "downscaled": [...], "same": bool}}
+    """
+    report = {}
+    for video_path in video_paths:
+        full = MIFExtractor(max_frames=max_frames, k=k)
+        downscaled = MIFExtractor(max_frames=max_frames, k=k, diff_width=diff_width)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            VideoFrameSource(video_path).run({
+                "full": (full, os.path.join(tmp_dir, "full")),
+                "downscaled": (downscaled, os.path.join(tmp_dir, "downscaled")),
+            })
+
+        same = full.selected_indices == downscaled.selected_indices
+        report[video_path] = {
+            "full": full.selected_indices,
+            "downscaled": downscaled.selected_indices,
+            "same": same,
+        }
+        print(f"{'✅' if same else '❌'} {video_path}: full={full.selected_indices} "
+              f"downscaled={downscaled.selected_indices}")
+
+    nb_same = sum(r["same"] for r in report.values())
+    print(f"📊 Same selection on {nb_same}/{len(report)} video(s) with diff_width={diff_width}")
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    # python -m frame_extractors.mif_extractor <video_or_folder> [...]
+    paths = []
+    for arg in sys.argv[1:]:
+        if os.path.isdir(arg):
+            paths += [
+                os.path.join(arg, f) for f in sorted(os.listdir(arg))
+                if f.lower().endswith((".mp4", ".mov"))
+            ]
+        else:
+            paths.append(arg)
+    compare_mif_diff_modes(paths)
@@ -0,0 +1,37 @@
+import threading
+import numpy as np
+from ultralytics import YOLO
+
+# Process-wide detectors, loaded once per weights file and shared across extractors and videos
+_DETECTORS = {}
+_WARMED_UP = set()
+_LOCK = threading.Lock()
+# YOLO predictors are not thread-safe: threads sharing a detector (e.g. lazy extraction by LLM workers) take turns
+_INFERENCE_LOCKS = {}
+
+
+def get_detector(weights: str = "yolov8n.pt", warmup: bool = False):
+    """
+    Return the shared YOLO detector for `weights`, loading it on first use.
+    :param weights: YOLO weights file
+    :param warmup: run one inference on a blank image so the first real batch is not slowed down
+    """
+    with _LOCK:
+        model = _DETECTORS.get(weights)
+        if model is None:
+            print(f"🧠 Loading detector: {weights}")
+            model = YOLO(weights)
+            _DETECTORS[weights] = model
+
+        if warmup and weights not in _WARMED_UP:
+            with detector_lock(model):
+                model(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+            _WARMED_UP.add(weights)
+
+    return model
+
+
+def detector_lock(model) -> threading.Lock:
+    """Return the lock to hold while running inference with `model` (one per detector instance)."""
+    # dict.setdefault is atomic: concurrent callers always get the same lock
+    return _INFERENCE_LOCKS.setdefault(id(model), threading.Lock())
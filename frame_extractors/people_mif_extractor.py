@@ -3,7 +3,7 @@ import cv2
 import numpy as np
 from typing import List
 from frame_extractors.base_extractor import FrameExtractor
-from frame_extractors.face_extractor import PeopleExtractor
+from frame_extractors.person_detections import PersonDetectionStage
 
 def compute_histogram_similarity(img1, img2) -> float:
     """Compute histogram similarity between two images (normalized correlation)."""
@@ -19,58 +19,121 @@ def compute_histogram_similarity(img1, img2) -> float:
     similarity = cv2.compareHist(hist_img1, hist_img2, cv2.HISTCMP_CORREL)
     return similarity
 
+def compute_histogram_signature(img, width: int = None) -> np.ndarray:
+    """
+    Compute the H-S histogram signature of an image as a centered, unit-norm float32 vector,
+    so that the dot product of two signatures is their HISTCMP_CORREL similarity.
+    :param width: downscale the image to this width first (None = full resolution)
+    """
+    if width and img.shape[1] > width:
+        height = max(1, round(img.shape[0] * width / img.shape[1]))
+        img = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(img, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1], None, [50, 60], [0, 180, 0, 256]).ravel()
+    hist -= hist.mean()
+    norm = np.linalg.norm(hist)
+    return hist / norm if norm > 0 else hist
+
 class PeopleMIFExtractor(FrameExtractor):
-    def __init__(self, max_frames: int = 10, interval_s: float = 0.5, similarity_threshold: float = 0.8):
+    def __init__(self, max_frames: int = 10, interval_s: float = 0.5, similarity_threshold: float = 0.8,
+                 model=None, detections=None, selection: str = "threshold", hist_width: int = 160):
         """
         :param max_frames: Maximum number of diverse people_1s frames to extract
-        :param interval_s: Frame extraction interval in seconds
+        :param interval_s: Frame extraction interval in seconds (rounded to a multiple of the detection grid, 0.5s)
         :param similarity_threshold: Maximum allowed similarity between selected frames (1.0 = identical)
+        :param model: Preloaded person detector (defaults to the shared one)
+        :param detections: Shared PersonDetectionStage (see PeopleExtractor)
+        :param selection: "threshold" (reject frames too similar to a selected one, by person score)
+                          or "maxmin" (greedily add the frame least similar to the selected set)
+        :param hist_width: Width of the thumbnail used for histograms (None = full resolution)
         """
+        if selection not in ("threshold", "maxmin"):
+            raise ValueError(f"Unsupported selection mode: {selection}")
         self.max_frames = max_frames
         self.interval_s = interval_s
         self.similarity_threshold = similarity_threshold
-
-    def extract(self, video_path: str, output_dir: str) -> List[str]:
-        os.makedirs(output_dir, exist_ok=True)
-
-        # Step 1: Extract all frames with people_1s detection
-        people_extractor = PeopleExtractor(interval_s=self.interval_s, return_person_score=True)
-        frames_with_scores = people_extractor.extract(video_path, output_dir)
-
-        if not frames_with_scores:
+        self.selection = selection
+        self.hist_width = hist_width
+        self._owns_detections = detections is None
+        self.detections = detections or PersonDetectionStage(model=model)
+        self.detections.subscribe(self)
+
+    def start(self, output_dir, fps, total_frames):
+        super().start(output_dir, fps, total_frames)
+        # Step 1: Keep every frame with people as (number, person score, JPEG bytes, timestamp)
+        # and its histogram signature
+        self.candidates = []
+        self.signatures = []
+        if self._owns_detections:
+            self.detections.start(None, fps, total_frames)
+
+    def wants_frame(self, index):
+        # Frames are sampled by the detection stage, on its grid
+        return self._owns_detections and self.detections.wants_frame(index)
+
+    def on_frame(self, frame, index, timestamp):
+        if self._owns_detections:
+            self.detections.on_frame(frame, index, timestamp)
+
+    def on_detection(self, detection, frame):
+        if not detection.has_person:
+            return
+        success, buffer = cv2.imencode(".jpg", frame)
+        if not success:
+            return
+        self.candidates.append((len(self.candidates), detection.area_ratio, buffer, detection.timestamp))
+        self.signatures.append(compute_histogram_signature(frame, self.hist_width))
+
+    def _select_threshold(self, order, similarities) -> List[int]:
+        selected = []
+        for i in order:
+            # Check if frame is sufficiently different from already selected ones
+            if not selected or similarities[i, selected].max() < self.similarity_threshold:
+                selected.append(i)
+            if len(selected) >= self.max_frames:
+                break
+        return selected
+
+    def _select_maxmin(self, order, similarities) -> List[int]:
+        order = np.asarray(order)
+        selected = [int(order[0])]
+        # Highest similarity of each candidate (in score order) to the selected set
+        closest = similarities[order, order[0]].copy()
+        closest[0] = np.inf
+        while len(selected) < min(self.max_frames, len(order)):
+            pos = int(np.argmin(closest))
+            selected.append(int(order[pos]))
+            closest = np.maximum(closest, similarities[order, order[pos]])
+            closest[pos] = np.inf
+        return selected
+
+    def finalize(self) -> List[str]:
+        self.detections.flush()
+        candidates, self.candidates = self.candidates, []
+        signatures, self.signatures = self.signatures, []
+
+        if not candidates:
             return []
 
         # Step 2: Sort frames by people_1s area ratio (descending)
-        frames_with_scores.sort(key=lambda x: x[1], reverse=True)
+        order = sorted(range(len(candidates)), key=lambda i: candidates[i][1], reverse=True)
 
-        # Step 3: Select frames ensuring visual diversity
-        selected_frames = []
-        selected_images = []
+        # Step 3: Select frames ensuring visual diversity (correlation of all pairs at once)
+        matrix = np.stack(signatures)
+        similarities = matrix @ matrix.T
+        if self.selection == "maxmin":
+            selected = self._select_maxmin(order, similarities)
+        else:
+            selected = self._select_threshold(order, similarities)
 
-        for frame_path, _ in frames_with_scores:
-            frame = cv2.imread(frame_path)
-
-            # Check if frame is sufficiently different from already selected ones
-            is_similar = False
-            for selected_img in selected_images:
-                similarity = compute_histogram_similarity(frame, selected_img)
-                if similarity >= self.similarity_threshold:
-                    is_similar = True
-                    break
-
-            if not is_similar:
-                selected_frames.append(frame_path)
-                selected_images.append(frame)
-
-            if len(selected_frames) >= self.max_frames:
-                break
-
-        # Step 4: Cleanup: remove unused frames from disk
-        all_frame_paths = [fp for fp, _ in frames_with_scores]
-        unused_frames = set(all_frame_paths) - set(selected_frames)
-
-        for frame_path in unused_frames:
-            if os.path.exists(frame_path):
-                os.remove(frame_path)
+        # Step 4: Only the selected frames are written to disk
+        selected_frames = []
+        for i in selected:
+            frame_number, _, buffer, timestamp = candidates[i]
+            frame_path = os.path.join(self.output_dir, f"frame_{frame_number:04d}.jpg")
+            with open(frame_path, "wb") as f:
+                f.write(buffer.tobytes())
+            selected_frames.append(frame_path)
+            self.timestamps[frame_path] = timestamp
 
         return selected_frames
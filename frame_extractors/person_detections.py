@@ -0,0 +1,126 @@
+from typing import List, NamedTuple
+from frame_extractors.base_extractor import FrameExtractor
+from frame_extractors.model_registry import detector_lock, get_detector
+
+
+class PersonDetection(NamedTuple):
+    frame_index: int
+    timestamp: float
+    has_person: bool
+    bboxes: list
+    area_ratio: float
+
+
+class PersonDetectionStage(FrameExtractor):
+    """
+    Runs person detection once per frame for every subscribed people extractor.
+    The stage samples a single time grid: row k is the frame closest to k * `interval_s` seconds
+    (0.5s by default), i.e. frame round(k * interval_s * fps), so the grid does not drift at
+    fractional frame rates. A subscriber sampling every `interval_s` * n seconds (e.g. 1s) takes the
+    rows whose time is a multiple of its interval, whatever the other subscribers. Only rows wanted by at least
+    one subscriber are detected; the stage stores one PersonDetection row per detected frame and
+    pushes each row, with its frame, to the subscribers sampling it.
+    """
+
+    def __init__(self, model=None, weights: str = "yolov8n.pt", batch_size: int = 16, interval_s: float = 0.5):
+        """
+        :param model: Preloaded detector (defaults to the shared one for `weights`, loaded on first use)
+        :param weights: YOLO weights file used when no model is given
+        :param batch_size: Number of frames sent to YOLO per call
+        :param interval_s: Sampling grid in seconds; subscriber intervals are rounded to multiples of it
+        """
+        self._model = model
+        self.weights = weights
+        self.batch_size = max(1, batch_size)
+        self.interval_s = interval_s
+        self.subscribers = []
+        self._strides = []
+        self.detections: List[PersonDetection] = []
+        self._pending = []
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = get_detector(self.weights)
+        return self._model
+
+    def subscribe(self, extractor):
+        """Register an extractor with an `interval_s` attribute and an `on_detection(detection, frame)` method."""
+        self.subscribers.append(extractor)
+
+    @staticmethod
+    def _parse_person_boxes(result, img_area):
+        person_boxes = [box for box in result.boxes if int(box.cls[0]) == 0]
+        if not person_boxes:
+            return False, [], 0.0
+
+        total_person_area = 0
+        bboxes = []
+
+        for box in person_boxes:
+            x1, y1, x2, y2 = map(int, box.xyxy[0])
+            w, h = x2 - x1, y2 - y1
+            area = w * h
+            total_person_area += area
+            bboxes.append((x1, y1, x2, y2))
+
+        person_area_ratio = total_person_area / img_area
+        return True, bboxes, person_area_ratio
+
+    def detect_people(self, images: list) -> list:
+        """
+        Run person detection on a batch of in-memory BGR images.
+        Return one (has_person, bboxes, person_area_ratio) tuple per image.
+        """
+        if not images:
+            return []
+        model = self.model
+        with detector_lock(model):
+            results = model(images, verbose=False)
+        return [
+            self._parse_person_boxes(result, image.shape[0] * image.shape[1])
+            for result, image in zip(results, images)
+        ]
+
+    def start(self, output_dir, fps, total_frames):
+        super().start(output_dir, fps, total_frames)
+        # Frames per grid row (fractional, e.g. 14.985 at 29.97 fps)
+        self.frame_step = max(1.0, fps * self.interval_s)
+        self._strides = [
+            (extractor, max(1, round(extractor.interval_s / self.interval_s))) for extractor in self.subscribers
+        ]
+        self.detections = []
+        self._pending = []
+
+    def _row(self, index):
+        """Grid row of frame `index`, or None if the frame is not on the grid."""
+        row = round(index / self.frame_step)
+        return row if round(row * self.frame_step) == index else None
+
+    def wants_frame(self, index):
+        row = self._row(index)
+        return row is not None and any(row % stride == 0 for _, stride in self._strides)
+
+    def on_frame(self, frame, index, timestamp):
+        if not self.wants_frame(index):
+            return
+
+        self._pending.append((frame, index, timestamp))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Detect the pending frames and push the results to the subscribers."""
+        pending, self._pending = self._pending, []
+        results = self.detect_people([frame for frame, _, _ in pending])
+        for (frame, index, timestamp), (has_person, bboxes, area_ratio) in zip(pending, results):
+            detection = PersonDetection(index, timestamp, has_person, bboxes, area_ratio)
+            self.detections.append(detection)
+            row = self._row(index)
+            for extractor, stride in self._strides:
+                if row % stride == 0:
+                    extractor.on_detection(detection, frame)
+
+    def finalize(self) -> List[PersonDetection]:
+        self.flush()
+        return self.detections
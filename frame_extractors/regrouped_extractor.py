@@ -5,13 +5,15 @@ from typing import List
 from frame_extractors.base_extractor import FrameExtractor
 
 class RegroupedExtractor(FrameExtractor):
-    def __init__(self, interval_s: float = 1.0, max_output_images: int = 10):
+    def __init__(self, interval_s: float = 1.0, max_output_images: int = 10, max_width: int = None):
         """
         :param interval_s: Frame extraction interval in seconds
         :param max_output_images: Maximum number of grouped images to create
+        :param max_width: Downscale grouped images wider than this (None = keep full width)
         """
         self.interval_s = interval_s
         self.max_output_images = max_output_images
+        self.max_width = max_width
 
     def _combine_frames(self, frames: List, frame_shape):
         """Combine multiple frames horizontally."""
@@ -22,30 +24,23 @@ class RegroupedExtractor(FrameExtractor):
             combined[0:h, idx*w:(idx+1)*w] = frame
         return combined
 
-    def extract(self, video_path: str, output_dir: str) -> List[str]:
-        os.makedirs(output_dir, exist_ok=True)
+    def start(self, output_dir, fps, total_frames):
+        super().start(output_dir, fps, total_frames)
+        self.frame_interval = max(1, int(fps * self.interval_s))
+        self.collected_frames = []
+        self.collected_timestamps = []
 
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            print(f"Error: Cannot open video '{video_path}'.")
-            return []
-
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_interval = int(fps * self.interval_s)
-        collected_frames = []
-        count = 0
-
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            if count % frame_interval == 0:
-                collected_frames.append(frame)
+    def wants_frame(self, index):
+        return index % self.frame_interval == 0
 
-            count += 1
+    def on_frame(self, frame, index, timestamp):
+        if index % self.frame_interval == 0:
+            self.collected_frames.append(frame)
+            self.collected_timestamps.append(timestamp)
 
-        cap.release()
+    def finalize(self) -> List[str]:
+        collected_frames, collected_timestamps = self.collected_frames, self.collected_timestamps
+        self.collected_frames, self.collected_timestamps = [], []
 
         if not collected_frames:
             return []
@@ -55,6 +50,7 @@ class RegroupedExtractor(FrameExtractor):
         frame_shape = collected_frames[0].shape
 
         grouped_images = []
+        group_timestamps = []
         i = 0
         while i < total_frames:
             group = collected_frames[i:i+frames_per_image]
@@ -67,7 +63,11 @@ class RegroupedExtractor(FrameExtractor):
                 group.append(black_frame)
 
             combined = self._combine_frames(group, frame_shape)
+            if self.max_width and combined.shape[1] > self.max_width:
+                height = max(1, round(combined.shape[0] * self.max_width / combined.shape[1]))
+                combined = cv2.resize(combined, (self.max_width, height), interpolation=cv2.INTER_AREA)
             grouped_images.append(combined)
+            group_timestamps.append(collected_timestamps[i])
             i += frames_per_image
 
         # Limit to max_output_images
@@ -75,8 +75,9 @@ class RegroupedExtractor(FrameExtractor):
 
         saved_paths = []
         for idx, img in enumerate(grouped_images):
-            path = os.path.join(output_dir, f"grouped_frame_{idx:04d}.jpg")
+            path = os.path.join(self.output_dir, f"grouped_frame_{idx:04d}.jpg")
             cv2.imwrite(path, img)
             saved_paths.append(path)
+            self.timestamps[path] = group_timestamps[idx]
 
         return saved_paths
@@ -6,24 +6,20 @@ class RegularExtractor(FrameExtractor):
     def __init__(self, interval_s: float = 1.0):
         self.interval_s = interval_s
 
-    def extract(self, video_path, output_dir):
-        os.makedirs(output_dir, exist_ok=True)
-        cap = cv2.VideoCapture(video_path)
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        frame_interval = int(fps * self.interval_s)
-        frame_idx = 0
-        saved_frames = []
-        count = 0
+    def start(self, output_dir, fps, total_frames):
+        super().start(output_dir, fps, total_frames)
+        self.frame_interval = max(1, int(fps * self.interval_s))
+        self.saved_frames = []
 
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            if count % frame_interval == 0:
-                frame_path = os.path.join(output_dir, f"frame_{frame_idx:04d}.jpg")
-                cv2.imwrite(frame_path, frame)
-                saved_frames.append(frame_path)
-                frame_idx += 1
-            count += 1
-        cap.release()
-        return saved_frames
+    def wants_frame(self, index):
+        return index % self.frame_interval == 0
+
+    def on_frame(self, frame, index, timestamp):
+        if index % self.frame_interval == 0:
+            frame_path = os.path.join(self.output_dir, f"frame_{len(self.saved_frames):04d}.jpg")
+            cv2.imwrite(frame_path, frame)
+            self.saved_frames.append(frame_path)
+            self.timestamps[frame_path] = timestamp
+
+    def finalize(self):
+        return self.saved_frames
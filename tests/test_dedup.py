@@ -0,0 +1,101 @@
+import random
+import cv2
+import numpy as np
+import pytest
+from data_filling.pipeline.tools_pipeline.dedup import VideoDeduplicator, video_fingerprint
+
+RESULT = {"video_id": "abc", "video_url": "https://cdn-a/ad.mp4", "tag": "1"}
+
+
+def _flip(dhash: int, bits: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), bits):
+        dhash ^= 1 << bit
+    return dhash
+
+
+@pytest.fixture
+def rng():
+    return random.Random(7)
+
+
+@pytest.fixture
+def signature(rng):
+    # Informative frame hashes: about half of their 64 bits set
+    return {"frames": [rng.getrandbits(64) for _ in range(5)], "duration": 30.0}
+
+
+@pytest.fixture
+def dedup(tmp_path, signature):
+    dedup = VideoDeduplicator(str(tmp_path / "dedup.sqlite"), max_distance=8, min_frames=3)
+    dedup.add(VideoDeduplicator.scope("Brand", "v1"), ("bytes-a", signature), RESULT)
+    return dedup
+
+
+def test_matches_identical_bytes(dedup):
+    scope = VideoDeduplicator.scope("Brand", "v1")
+    assert dedup.lookup(scope, ("bytes-a", {"frames": [None] * 5, "duration": 0.0})) == RESULT
+
+
+def test_matches_a_reencoded_copy(dedup, signature, rng):
+    scope = VideoDeduplicator.scope("Brand", "v1")
+    reencoded = {"frames": [_flip(h, 3, rng) for h in signature["frames"]], "duration": 30.2}
+    assert dedup.lookup(scope, ("bytes-b", reencoded)) == RESULT
+
+
+def test_index_is_persisted(tmp_path, dedup, signature):
+    reopened = VideoDeduplicator(str(tmp_path / "dedup.sqlite"))
+    assert reopened.lookup(VideoDeduplicator.scope("Brand", "v1"), ("bytes-b", signature)) == RESULT
+
+
+def test_other_scope_does_not_match(dedup, signature):
+    assert dedup.lookup(VideoDeduplicator.scope("Brand", "v2"), ("bytes-a", signature)) is None
+    assert dedup.lookup(VideoDeduplicator.scope("Other", "v1"), ("bytes-b", signature)) is None
+
+
+@pytest.mark.parametrize("change", ["distant_frame", "duration", "uniform_in_one"])
+def test_rejects_different_videos(dedup, signature, rng, change):
+    frames = list(signature["frames"])
+    duration = signature["duration"]
+    if change == "distant_frame":
+        frames[2] = _flip(frames[2], 20, rng)
+    elif change == "duration":
+        duration = 31.0  # a cut-down edit
+    elif change == "uniform_in_one":
+        frames[0] = None
+    scope = VideoDeduplicator.scope("Brand", "v1")
+    assert dedup.lookup(scope, ("bytes-b", {"frames": frames, "duration": duration})) is None
+
+
+def test_nearly_empty_hashes_do_not_count_as_matching_frames(dedup, signature):
+    # Logos on a plain background: hashes with almost no bit set (or unset) match whatever the video
+    scope = VideoDeduplicator.scope("Brand", "v2")
+    flat = [0, 1, (1 << 64) - 1]
+    dedup.add(scope, ("bytes-c", {"frames": signature["frames"][:2] + flat, "duration": 30.0}), RESULT)
+    probe = {"frames": signature["frames"][:2] + [0, 1 << 5, (1 << 64) - 1], "duration": 30.0}
+    assert dedup.lookup(scope, ("bytes-d", probe)) is None
+
+    dedup.min_frames = 2
+    assert dedup.lookup(scope, ("bytes-d", probe)) == RESULT
+
+
+def _write_video(path: str, size: tuple, frames: int = 60, fps: float = 25.0):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    scene = np.random.default_rng(3).integers(0, 255, (12, 16, 3), dtype=np.uint8)
+    for i in range(frames):
+        shifted = np.roll(scene, i // 10, axis=1)  # a new shot every 10 frames
+        writer.write(cv2.resize(shifted, size, interpolation=cv2.INTER_NEAREST))
+    writer.release()
+
+
+def test_fingerprints_a_rescaled_reencode_as_duplicate(tmp_path):
+    original, copy, other = (str(tmp_path / name) for name in ("a.mp4", "b.mp4", "c.mp4"))
+    _write_video(original, (320, 240))
+    _write_video(copy, (160, 120))
+    _write_video(other, (320, 240), frames=100)
+
+    dedup = VideoDeduplicator(str(tmp_path / "dedup.sqlite"))
+    scope = VideoDeduplicator.scope("Brand", "v1")
+    dedup.add(scope, video_fingerprint(original), RESULT)
+    assert video_fingerprint(copy)[0] != video_fingerprint(original)[0]
+    assert dedup.lookup(scope, video_fingerprint(copy)) == RESULT
+    assert dedup.lookup(scope, video_fingerprint(other)) is None
@@ -0,0 +1,87 @@
+import os
+from data_filling.pipeline.tools_pipeline.extraction_cache import MANIFEST, ExtractionCache, params_key
+
+VIDEO = "ab" + "0" * 62
+PARAMS = {"interval_s": 1.0}
+
+
+def _store(cache: ExtractionCache, video_hash: str, method: str, size: int = 1000, params: dict = PARAMS) -> dict:
+    tmp_dir = cache.new_tmp_dir(video_hash, method, params)
+    paths = [os.path.join(tmp_dir, "frame_0000.jpg")]
+    with open(paths[0], "wb") as f:
+        f.write(b"\0" * size)
+    return cache.commit(tmp_dir, video_hash, method, params, paths, {paths[0]: 0.5004})
+
+
+def test_params_key_depends_on_method_and_params():
+    assert params_key("regular_1s", {"a": 1, "b": 2}) == params_key("regular_1s", {"b": 2, "a": 1})
+    assert params_key("regular_1s", PARAMS) != params_key("regular_1s", {"interval_s": 0.5})
+    assert params_key("regular_1s", PARAMS).startswith("regular_1s-")
+
+
+def test_committed_entry_has_a_manifest_and_is_found_by_content(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    stored = _store(cache, VIDEO, "regular_1s")
+    entry = cache.entry_dir(VIDEO, "regular_1s", PARAMS)
+    assert stored["paths"] == [os.path.join(entry, "frame_0000.jpg")]
+    assert os.listdir(os.path.dirname(entry)) == [os.path.basename(entry)]  # no temporary folder left
+
+    manifest = ExtractionCache(str(tmp_path)).get(VIDEO, "regular_1s", PARAMS)
+    assert manifest["files"] == ["frame_0000.jpg"]
+    assert manifest["timestamps"] == {"frame_0000.jpg": 0.5}
+    assert manifest["size"] == 1000
+    assert manifest["paths"] == stored["paths"]
+    assert cache.get(VIDEO, "regular_1s", {"interval_s": 0.5}) is None
+
+
+def test_folder_without_manifest_is_a_removed_leftover(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    _store(cache, VIDEO, "regular_1s")
+    entry = cache.entry_dir(VIDEO, "regular_1s", PARAMS)
+    os.remove(os.path.join(entry, MANIFEST))
+
+    assert cache.get(VIDEO, "regular_1s", PARAMS) is None
+    assert not os.path.exists(entry)
+
+
+def test_concurrent_commit_keeps_the_first_entry(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    first = cache.new_tmp_dir(VIDEO, "mif", PARAMS)
+    second = cache.new_tmp_dir(VIDEO, "mif", PARAMS)
+    paths = {}
+    for tmp_dir, size in ((first, 10), (second, 20)):
+        paths[tmp_dir] = [os.path.join(tmp_dir, "frame_0000.jpg")]
+        with open(paths[tmp_dir][0], "wb") as f:
+            f.write(b"\0" * size)
+
+    assert cache.commit(first, VIDEO, "mif", PARAMS, paths[first])["size"] == 10
+    assert cache.commit(second, VIDEO, "mif", PARAMS, paths[second])["size"] == 10
+    assert not os.path.exists(second)
+
+
+def test_discard_removes_empty_video_folders(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    tmp_dir = cache.new_tmp_dir(VIDEO, "regular_1s", PARAMS)
+    cache.discard(tmp_dir)
+    assert os.listdir(str(tmp_path)) == []
+
+    _store(cache, VIDEO, "regular_1s")
+    cache.discard(cache.new_tmp_dir(VIDEO, "mif", PARAMS))
+    assert cache.get(VIDEO, "regular_1s", PARAMS) is not None
+
+
+def test_evicts_least_recently_used_entries_beyond_the_budget(tmp_path):
+    cache = ExtractionCache(str(tmp_path), max_gb=2500 / 1024 ** 3)
+    videos = [f"{i:02d}" + "0" * 62 for i in range(3)]
+    for i, video in enumerate(videos):
+        _store(cache, video, "regular_1s")
+        manifest_path = os.path.join(cache.entry_dir(video, "regular_1s", PARAMS), MANIFEST)
+        os.utime(manifest_path, (1000 + i, 1000 + i))
+
+    cache.get(videos[0], "regular_1s", PARAMS)  # the oldest entry is used again
+    cache.evict_to_size()
+
+    assert cache.get(videos[1], "regular_1s", PARAMS) is None
+    assert not os.path.exists(os.path.dirname(cache.entry_dir(videos[1], "regular_1s", PARAMS)))
+    assert cache.get(videos[0], "regular_1s", PARAMS) is not None
+    assert cache.get(videos[2], "regular_1s", PARAMS) is not None
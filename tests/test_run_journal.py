@@ -0,0 +1,48 @@
+from data_filling.pipeline.tools_pipeline.run_journal import RunJournal, job_key
+
+
+def test_job_key_is_stable_per_url_brand_and_version():
+    assert job_key("https://cdn/a.mp4", "Brand", "v1") == job_key("https://cdn/a.mp4", "Brand", "v1")
+    assert job_key("https://cdn/a.mp4", "Brand", "v1") != job_key("https://cdn/a.mp4", "Brand", "v2")
+    assert job_key("https://cdn/a.mp4", "Brand", "v1") != job_key("https://cdn/a.mp4", "Other", "v1")
+
+
+def test_restarted_run_resumes_completed_rows(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path)
+    journal.append("a", {"video_id": "a", "tag": "1"})
+    journal.append("b", {"video_id": "b", "tag": "0"})
+    journal.close()
+
+    journal = RunJournal(path)
+    assert len(journal) == 2
+    assert "a" in journal and "c" not in journal
+    assert journal.read("b") == {"video_id": "b", "tag": "0"}
+
+    # An earlier result is handed back once, repeated input rows are then duplicates
+    assert journal.take("a") == {"video_id": "a", "tag": "1"}
+    assert journal.take("a") is None
+    assert "a" in journal
+
+    journal.append("c", {"video_id": "c", "tag": "1"})
+    assert journal.take("c") is None  # completed in this run
+    journal.close()
+    assert len(RunJournal(path)) == 3
+
+
+def test_truncated_record_is_dropped_and_redone(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    journal = RunJournal(path)
+    journal.append("a", {"tag": "1"})
+    journal.close()
+    with open(path, "ab") as f:
+        f.write(b'{"key": "b", "result": {"ta')  # crash in the middle of a write
+
+    journal = RunJournal(path)
+    assert "a" in journal and "b" not in journal
+    journal.append("b", {"tag": "0"})
+    journal.close()
+
+    journal = RunJournal(path)
+    assert journal.take("a") == {"tag": "1"}
+    assert journal.take("b") == {"tag": "0"}
@@ -0,0 +1,82 @@
+import pytest
+import regex
+from data_filling.model.tools import prompt_builder
+from data_filling.model.tools.benchmark_split_prompt import legacy_split_prompt, synthetic_template
+from data_filling.model.tools.prompt_builder import (
+    build_prompt_messages, estimate_chunks_tokens, estimate_tokens_from_messages, smart_split_prompt
+)
+
+# cl100k_base pre-tokenization: BPE never merges tokens across these pieces
+_PIECES = regex.compile(
+    r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]++[\r\n]*|\s*[\r\n]|\s+(?!\S)|\s+"""
+)
+
+IMAGES = ["A" * 64] * 10
+TRANSCRIPTIONS = ["A voice says: enjoy responsibly."]
+
+
+class PieceEncoding:
+    """Offline stand-in for a tiktoken encoding: one token per pre-tokenized piece."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, text: str) -> list:
+        self.calls += 1
+        return _PIECES.findall(text)
+
+
+@pytest.fixture
+def encoding(monkeypatch):
+    enc = PieceEncoding()
+    monkeypatch.setattr(prompt_builder.tiktoken, "encoding_for_model", lambda model: enc)
+    monkeypatch.setattr(prompt_builder.tiktoken, "get_encoding", lambda name: enc)
+    prompt_builder._get_encoding.cache_clear()
+    prompt_builder._count_tokens.cache_clear()
+    yield enc
+    prompt_builder._get_encoding.cache_clear()
+    prompt_builder._count_tokens.cache_clear()
+
+
+def _full_cost(template: dict) -> int:
+    messages = build_prompt_messages(template, IMAGES[:6], TRANSCRIPTIONS)
+    return estimate_tokens_from_messages(messages, "gpt-4o")
+
+
+def _boundaries(chunks) -> list:
+    return [(list(fields), len(images)) for fields, images, _ in chunks]
+
+
+@pytest.mark.parametrize("divisor", [7, 3, 1])
+def test_same_chunks_as_legacy_splitter(encoding, divisor):
+    template = synthetic_template(40)
+    args = (template, IMAGES, TRANSCRIPTIONS, _full_cost(template) // divisor + 1, "gpt-4o", 6, 100)
+    chunks = smart_split_prompt(*args)
+    assert len(chunks) > 2 if divisor > 1 else len(chunks) == 2
+    assert _boundaries(chunks) == _boundaries(legacy_split_prompt(*args))
+
+
+def test_chunk_estimates_match_the_built_messages(encoding):
+    template = synthetic_template(30)
+    max_tokens = _full_cost(template) // 4
+    chunks = smart_split_prompt(template, IMAGES, TRANSCRIPTIONS, max_tokens, "gpt-4o", max_chunks=100)
+
+    costs = [
+        estimate_tokens_from_messages(build_prompt_messages(fields, images, transcript), "gpt-4o")
+        for fields, images, transcript in chunks
+    ]
+    assert estimate_chunks_tokens(chunks, "gpt-4o") == sum(costs)
+    assert all(cost <= max_tokens for cost in costs)
+
+
+def test_each_field_is_tokenized_a_constant_number_of_times(encoding):
+    template = synthetic_template(80)
+    max_tokens = _full_cost(template) // 5
+
+    smart_split_prompt(template, IMAGES, TRANSCRIPTIONS, max_tokens, "gpt-4o", max_chunks=100)
+    # 4 positional costs per field, plus the per-image-chunk prompt prefix
+    assert encoding.calls <= 4 * len(template) + 10
+
+    calls = encoding.calls
+    smart_split_prompt(template, IMAGES, TRANSCRIPTIONS, max_tokens, "gpt-4o", max_chunks=100)
+    assert encoding.calls == calls  # field costs are memoized across calls
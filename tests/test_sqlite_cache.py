@@ -0,0 +1,66 @@
+import pytest
+from data_filling.utils import sqlite_cache
+from data_filling.utils.sqlite_cache import SQLiteCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(sqlite_cache, "time", clock)
+    return clock
+
+
+def _keys(cache: SQLiteCache) -> set:
+    return {key for key, in cache._conn.execute(f"SELECT key FROM {cache.table}")}
+
+
+def test_put_get_round_trip_across_instances(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    SQLiteCache(path, "answers").put("k", {"tag": "1", "label": "é"})
+
+    cache = SQLiteCache(path, "answers")
+    assert cache.get("k") == {"tag": "1", "label": "é"}
+    assert cache.get("missing") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert SQLiteCache(path, "other_table").get("k") is None
+
+
+def test_evicts_least_recently_used_entries_beyond_the_budget(tmp_path, clock):
+    # 1000-byte values, 5000-byte budget
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite"), "answers", max_mb=5000 / 1024 ** 2)
+    cache._EVICT_EVERY = 1000
+    for i in range(8):
+        clock.now += 1
+        cache.put(f"k{i}", "x" * 998)
+    clock.now += 1
+    assert cache.get("k0") is not None  # now the most recently used
+
+    cache._EVICT_EVERY = 1
+    clock.now += 1
+    cache.put("k8", "x" * 998)
+
+    # Down to 90% of the budget, oldest accesses first
+    assert _keys(cache) == {"k0", "k6", "k7", "k8"}
+
+
+def test_expired_entries_are_ignored_and_purged(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite")
+    cache = SQLiteCache(path, "answers", max_age_days=1)
+    cache.put("old", 1)
+    clock.now += 10
+    cache.put("recent", 2)
+
+    clock.now += 86400 - 5
+    assert cache.get("old") is None
+    assert cache.get("recent") == 2
+
+    clock.now += 86400
+    assert _keys(SQLiteCache(path, "answers", max_age_days=1)) == set()